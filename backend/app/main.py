@@ -19,19 +19,39 @@ Privacy & Compliance:
 Team: WonderOfUs (Ayoola Opere, Mujah Sokoro)
 """
 
-from fastapi import FastAPI
+from fastapi import APIRouter, FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse, Response
 from app.routes import mood, insights, crisis, dev
+from app.routes.encoding import NegotiatedGZipMiddleware
+from app.services.ai_service import get_ai_service
+from app.services.batcher import inference_batcher
+from app.services.executor import INFER_POOL, run_in_pool
+from app.services.telus_ai_service import telus_ai_service
+from logging.handlers import QueueHandler, QueueListener
+from typing import List
+import asyncio
+import hashlib
 import logging
+import orjson
+import queue
 from dotenv import load_dotenv
 import os
 
 # Load environment variables from .env file (if it exists)
 load_dotenv()
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Configure logging: handlers on the request path only enqueue records; a
+# background listener thread formats them and writes to stderr.
+# Production defaults to WARNING so per-request INFO lines are skipped entirely.
+LOG_LEVEL = os.getenv("LOG_LEVEL", "WARNING" if os.getenv("ENVIRONMENT") == "production" else "INFO").upper()
+log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(-1)
+_log_stream_handler = logging.StreamHandler()
+_log_stream_handler.setFormatter(logging.Formatter(logging.BASIC_FORMAT))
+log_listener = QueueListener(log_queue, _log_stream_handler)
+_log_queue_handler = QueueHandler(log_queue)
+_log_queue_handler.setFormatter(logging.Formatter("%(message)s"))  # Listener applies the real format
+logging.basicConfig(level=LOG_LEVEL, handlers=[_log_queue_handler])
 logger = logging.getLogger(__name__)
 
 # Application metadata
@@ -55,94 +75,204 @@ Built for TELUS Hackathon 2025 - AI at the Edge of Innovation
 - Mujah Sokoro
 """
 
-app = FastAPI(
-    title=APP_TITLE,
-    description=APP_DESCRIPTION,
-    version=APP_VERSION,
-    docs_url="/docs",
-    redoc_url="/redoc",
-    contact={
-        "name": "Team WonderOfUs",
-        "url": "https://github.com/wonderofme/wonderofus-mental-health",
-    },
-    license_info={
-        "name": "TELUS Hackathon 2025",
-    }
+# Routers mounted under the versioned API prefix: (path, module, tag)
+API_V1_PREFIX = "/api"
+ROUTES = (
+    ("mood", mood, "Mood Analysis"),
+    ("insights", insights, "Insights & Patterns"),
+    ("crisis", crisis, "Crisis Detection"),
+    ("dev", dev, "Development & Demo"),
 )
 
-# CORS middleware for frontend connection
-# Allow all origins for hackathon deployment (can be restricted in production)
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # Allows all origins (Vercel, localhost, etc.)
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+# System endpoints (root and health) live outside the versioned API
+system_router = APIRouter(tags=["System"])
 
-# Include routers with versioned API prefix
-API_V1_PREFIX = "/api"
-app.include_router(mood.router, prefix=f"{API_V1_PREFIX}/mood", tags=["Mood Analysis"])
-app.include_router(insights.router, prefix=f"{API_V1_PREFIX}/insights", tags=["Insights & Patterns"])
-app.include_router(crisis.router, prefix=f"{API_V1_PREFIX}/crisis", tags=["Crisis Detection"])
-app.include_router(dev.router, prefix=f"{API_V1_PREFIX}/dev", tags=["Development & Demo"])
-
-
-@app.on_event("startup")
-async def startup_event():
-    """Application startup - initialize services and log status"""
-    logger.info("="*60)
-    logger.info("WonderOfUs - AI Mental Health Companion")
-    logger.info("TELUS Hackathon 2025 - AI at the Edge of Innovation")
-    logger.info("="*60)
-    logger.info(f"Version: {APP_VERSION}")
-    logger.info("AI Models: Hugging Face Transformers (local inference)")
-    logger.info("TELUS AI Factory: gemma-3-27b, deepseekv32")
-    logger.info("Privacy: HIPAA-compliant design (all processing local)")
-    logger.info("="*60)
-
-
-@app.get("/", tags=["System"])
-async def root():
+
+def get_cors_origins() -> List[str]:
+    """
+    Allowed CORS origins from the CORS_ORIGINS env var (comma-separated)
+    
+    Defaults to all origins for hackathon deployment (Vercel, localhost, etc.);
+    set e.g. CORS_ORIGINS=https://app.example.com in production.
+    """
+    origins = os.getenv("CORS_ORIGINS", "*")
+    return [origin.strip() for origin in origins.split(",") if origin.strip()] or ["*"]
+
+
+def create_app() -> FastAPI:
+    """
+    Build the FastAPI application
+    
+    Configures middleware, routers and lifecycle hooks on a single app
+    instance; `app` below is the instance served by uvicorn.
+    """
+    app = FastAPI(
+        title=APP_TITLE,
+        description=APP_DESCRIPTION,
+        version=APP_VERSION,
+        docs_url="/docs",
+        redoc_url="/redoc",
+        default_response_class=ORJSONResponse,  # C-accelerated JSON encoding for every route
+        contact={
+            "name": "Team WonderOfUs",
+            "url": "https://github.com/wonderofme/wonderofus-mental-health",
+        },
+        license_info={
+            "name": "TELUS Hackathon 2025",
+        }
+    )
+    
+    # CORS middleware for frontend connection
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=get_cors_origins(),
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    
+    # Compress larger JSON responses (history, patterns) for mobile clients;
+    # small payloads aren't worth the CPU (gzip;q=0 is honored)
+    app.add_middleware(NegotiatedGZipMiddleware, minimum_size=500, compresslevel=6)
+    
+    # Include routers with versioned API prefix
+    for prefix, module, tag in ROUTES:
+        app.include_router(module.router, prefix=f"{API_V1_PREFIX}/{prefix}", tags=[tag])
+    app.include_router(system_router)
+    
+    @app.on_event("startup")
+    async def startup_event():
+        """Application startup - initialize services and log status"""
+        log_listener.start()
+        logger.info("="*60)
+        logger.info("WonderOfUs - AI Mental Health Companion")
+        logger.info("TELUS Hackathon 2025 - AI at the Edge of Innovation")
+        logger.info("="*60)
+        logger.info(f"Version: {APP_VERSION}")
+        logger.info("AI Models: Hugging Face Transformers (local inference)")
+        logger.info("TELUS AI Factory: gemma-3-27b, deepseekv32")
+        logger.info("Privacy: HIPAA-compliant design (all processing local)")
+        logger.info("="*60)
+        
+        # Blocking mood analysis runs on a dedicated pool so it never stalls the event loop
+        app.state.infer_pool = INFER_POOL
+        
+        # Load (and optionally compile) the local models now, so the first request doesn't pay for it
+        if os.getenv("COMPILE_MODELS", "false").lower() in ("true", "1", "yes"):
+            await run_in_pool(get_ai_service().compile_models)
+        elif os.getenv("PRELOAD_MODELS", "true").lower() in ("true", "1", "yes"):
+            await run_in_pool(get_ai_service().preload_models)
+        
+        # Start the micro-batcher that coalesces concurrent mood analysis requests
+        inference_batcher.start()
+        
+        # Open AI service connections in the background; startup doesn't wait on the network
+        app.state.ai_warmup = None
+        if os.getenv("WARMUP_AI_CLIENTS", "true").lower() in ("true", "1", "yes"):
+            app.state.ai_warmup = asyncio.create_task(telus_ai_service.warmup())
+    
+    @app.on_event("shutdown")
+    async def shutdown_event():
+        """Application shutdown - stop background services"""
+        await inference_batcher.stop()
+        if app.state.ai_warmup:
+            app.state.ai_warmup.cancel()
+        await telus_ai_service.aclose()
+        INFER_POOL.shutdown(wait=False)
+        get_ai_service().mood_cache.clear()  # Analyses of user text don't outlive the app
+        telus_ai_service.generation_cache.clear()
+        log_listener.stop()  # Flushes any queued records
+    
+    return app
+
+
+# Root payload never changes while the process runs - encode it once
+ROOT_INFO = {
+    "application": "WonderOfUs - AI Mental Health Companion",
+    "version": APP_VERSION,
+    "team": "WonderOfUs",
+    "members": ["Ayoola Opere", "Mujah Sokoro"],
+    "hackathon": "TELUS Hackathon 2025 - AI at the Edge of Innovation",
+    "track": "AI + Healthcare & Wellness",
+    "status": "operational",
+    "features": {
+        "sentiment_analysis": True,
+        "emotion_detection": True,
+        "crisis_detection": True,
+        "pattern_recognition": True,
+        "telus_ai_factory": True,
+        "privacy_first": True
+    },
+    "documentation": "/docs"
+}
+
+
+def _etag(body: bytes) -> str:
+    """Strong ETag for a response body"""
+    return '"' + hashlib.blake2b(body, digest_size=8).hexdigest() + '"'
+
+
+_ROOT_BODY = orjson.dumps(ROOT_INFO)
+_ROOT_ETAG = _etag(_ROOT_BODY)
+
+
+def _json_with_etag(request: Request, body: bytes, etag: str) -> Response:
+    """Serve pre-encoded JSON, or 304 Not Modified if the client's copy is current"""
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=10"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or etag in (tag.strip() for tag in if_none_match.split(","))):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@system_router.get("/")
+async def root(request: Request):
     """
     Root endpoint - API information and status
     
     Returns application metadata, version, and operational status.
     """
-    return {
-        "application": "WonderOfUs - AI Mental Health Companion",
-        "version": APP_VERSION,
-        "team": "WonderOfUs",
-        "members": ["Ayoola Opere", "Mujah Sokoro"],
-        "hackathon": "TELUS Hackathon 2025 - AI at the Edge of Innovation",
-        "track": "AI + Healthcare & Wellness",
-        "status": "operational",
-        "features": {
-            "sentiment_analysis": True,
-            "emotion_detection": True,
-            "crisis_detection": True,
-            "pattern_recognition": True,
-            "telus_ai_factory": True,
-            "privacy_first": True
-        },
-        "documentation": "/docs"
+    return _json_with_etag(request, _ROOT_BODY, _ROOT_ETAG)
+
+
+_HEALTH_BODY = orjson.dumps({
+    "status": "healthy",
+    "version": APP_VERSION,
+    "services": {
+        "api": "operational",
+        "ai_models": "loaded",
+        "telus_ai_factory": "connected"
     }
+})
+_HEALTH_ETAG = _etag(_HEALTH_BODY)
 
 
-@app.get("/health", tags=["System"])
-async def health_check():
+@system_router.get("/health")
+async def health_check(request: Request):
     """
     Health check endpoint for monitoring and load balancing
     
     Returns the current health status of the API and its components.
+    The body is fixed, so repeat probes get 304; cache counters, which
+    change on every request, are served by /health/caches instead.
     """
-    return {
-        "status": "healthy",
-        "version": APP_VERSION,
-        "services": {
-            "api": "operational",
-            "ai_models": "loaded",
-            "telus_ai_factory": "connected"
-        }
-    }
+    return _json_with_etag(request, _HEALTH_BODY, _HEALTH_ETAG)
+
+
+@system_router.get("/health/caches")
+async def cache_stats():
+    """
+    Mood analysis and generation cache sizes and hit/miss counters
+    
+    Never cached: the counters change on every analysis.
+    """
+    return ORJSONResponse(
+        {
+            "mood_cache": get_ai_service().mood_cache.stats(),
+            "generation_cache": telus_ai_service.generation_cache.stats()
+        },
+        headers={"Cache-Control": "no-store"}
+    )
+
 
+app = create_app()
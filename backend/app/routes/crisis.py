@@ -2,46 +2,24 @@
 Crisis Detection and Resources API Routes
 """
 
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-from typing import Optional
-from app.services.ai_service import ai_service
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import Response
+from pydantic import BaseModel, ConfigDict
+from typing import Any, Dict, Optional
+import gzip
+import orjson
+from app.services.ai_service import get_ai_service
+from app.services.crisis_keywords import match_crisis_keywords
+from app.services import batcher
+from app.routes.encoding import accepts_gzip
+from app.routes.validation import json_body, json_body_openapi
 
 router = APIRouter()
 
-
-class CrisisCheckRequest(BaseModel):
-    text: str
-    user_id: Optional[str] = "default_user"
-
-
-@router.post("/check")
-async def check_crisis_indicators(request: CrisisCheckRequest):
-    """
-    Check text for crisis indicators and provide resources
-    """
-    try:
-        # Analyze mood first
-        mood_analysis = ai_service.analyze_mood(request.text)
-        
-        # Check for crisis indicators
-        crisis_check = ai_service.detect_crisis_indicators(request.text, mood_analysis)
-        
-        return {
-            "success": True,
-            "crisis_detection": crisis_check,
-            "mood_analysis": mood_analysis
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error checking crisis indicators: {str(e)}")
-
-
-@router.get("/resources")
-async def get_crisis_resources():
-    """
-    Get crisis support resources
-    """
-    resources = [
+# Crisis support resources (static)
+_RESOURCES_PAYLOAD = {
+    "success": True,
+    "resources": [
         {
             "name": "Crisis Services Canada",
             "phone": "1-833-456-4566",
@@ -72,11 +50,74 @@ async def get_crisis_resources():
             "description": "Call immediately if you or someone else is in immediate danger",
             "priority": "IMMEDIATE"
         }
-    ]
+    ],
+    "note": "If you're in immediate danger, call 911 or go to your nearest emergency room"
+}
+_RESOURCES_JSON = orjson.dumps(_RESOURCES_PAYLOAD)
+_RESOURCES_GZIP = gzip.compress(_RESOURCES_JSON, compresslevel=9)
+
+
+class CrisisCheckRequest(BaseModel):
+    text: str
+    user_id: Optional[str] = "default_user"
+
+
+class CrisisCheckResponse(BaseModel):
+    model_config = ConfigDict(extra="forbid")
     
-    return {
-        "success": True,
-        "resources": resources,
-        "note": "If you're in immediate danger, call 911 or go to your nearest emergency room"
-    }
+    success: bool
+    crisis_detection: Dict[str, Any]
+    mood_analysis: Optional[Dict[str, Any]]
 
+
+@router.post("/check", response_model=CrisisCheckResponse, openapi_extra=json_body_openapi(CrisisCheckRequest))
+async def check_crisis_indicators(request: CrisisCheckRequest = Depends(json_body(CrisisCheckRequest))):
+    """
+    Check text for crisis indicators and provide resources
+    
+    Messages with a high-risk keyword are answered from the keyword scan
+    alone (mood_analysis is null), so the most urgent responses don't wait
+    on model inference.
+    """
+    try:
+        # Scan for keywords once; both checks below reuse the result
+        keyword_matches = match_crisis_keywords(request.text.lower())
+        
+        # Fast path: a high-risk keyword already forces HIGH risk
+        crisis_check = get_ai_service().quick_crisis_check(request.text, keyword_matches)
+        if crisis_check is not None:
+            return {
+                "success": True,
+                "crisis_detection": crisis_check,
+                "mood_analysis": None
+            }
+        
+        # Analyze mood first
+        mood_analysis = await batcher.infer(request.text)
+        
+        # Check for crisis indicators
+        crisis_check = await get_ai_service().detect_crisis_indicators_async(
+            request.text, mood_analysis, keyword_matches
+        )
+        
+        return {
+            "success": True,
+            "crisis_detection": crisis_check,
+            "mood_analysis": mood_analysis
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error checking crisis indicators: {str(e)}")
+
+
+@router.get("/resources")
+async def get_crisis_resources(request: Request):
+    """
+    Get crisis support resources
+    """
+    # Static payload - serialized and compressed once at import, served as raw bytes
+    headers = {"Cache-Control": "public, max-age=86400", "Vary": "Accept-Encoding"}
+    if accepts_gzip(request.headers.get("accept-encoding", "")):
+        # Content-Encoding is already set, so GZipMiddleware passes this through
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=_RESOURCES_GZIP, media_type="application/json", headers=headers)
+    return Response(content=_RESOURCES_JSON, media_type="application/json", headers=headers)
@@ -4,12 +4,86 @@ Development/Demo endpoints for hackathon presentation
 
 from fastapi import APIRouter, HTTPException
 from datetime import datetime, timedelta
-import random
-from app.services.mood_service import mood_service
-from app.services.ai_service import ai_service
+from typing import Optional, Tuple
+import numpy as np
+from app.services.mood_service import mood_service, EMOTION_COLS, EMOTION_INDEX as _COL
 
 router = APIRouter()
 
+# Emotion ranges per mood bucket (low: < 4, mid: < 6, high: >= 6)
+_LOW_MOOD_EMOTIONS = ((_COL["sadness"], 0.6, 0.9), (_COL["anxiety"], 0.5, 0.8),
+                      (_COL["fear"], 0.3, 0.6), (_COL["neutral"], 0.2, 0.4))
+_MID_MOOD_EMOTIONS = ((_COL["neutral"], 0.5, 0.7), (_COL["sadness"], 0.2, 0.4),
+                      (_COL["anxiety"], 0.2, 0.4), (_COL["joy"], 0.1, 0.3))
+_HIGH_MOOD_EMOTIONS = ((_COL["joy"], 0.5, 0.8), (_COL["neutral"], 0.3, 0.5),
+                       (_COL["optimism"], 0.4, 0.7), (_COL["sadness"], 0.0, 0.2))
+
+SAMPLE_TEXTS = (
+    # Low mood
+    (
+        "Feeling really down today. Everything seems overwhelming.",
+        "Struggling with anxiety and can't seem to shake it off.",
+        "Having a tough day. Nothing seems to be going right.",
+    ),
+    # Mid mood
+    (
+        "Feeling okay today. Not great, but managing.",
+        "It's been an average day. Some ups and downs.",
+        "Doing alright. Taking things one step at a time.",
+    ),
+    # High mood
+    (
+        "Feeling really good today! Things are looking up.",
+        "Had a great day. Feeling positive and energized.",
+        "Feeling optimistic about the future. Making progress!",
+    ),
+)
+
+
+def _generate_mood_vectors(n_days: int, seed: Optional[int] = None) -> Tuple[np.ndarray, ...]:
+    """
+    Generate the numeric part of the demo recovery arc
+    
+    Produces 2 entries per day (morning and afternoon) as whole-array draws
+    from a NumPy generator. Mood starts low and improves from 2.5 to 7.5
+    over `n_days`.
+    
+    Args:
+        n_days: Number of days to generate
+        seed: Optional seed for reproducible demo data
+        
+    Returns:
+        Tuple of (mood_scores, emotions, sentiment_scores, minutes, text_choices);
+        `emotions` has one column per EMOTION_COLS entry, NaN where absent
+    """
+    rng = np.random.default_rng(seed)
+    
+    # Base mood improves from 2.5 to 7.5 over the period; morning entries are
+    # slightly lower and afternoon entries slightly higher
+    base_mood = 2.5 + np.linspace(0.0, 1.0, n_days)[:, None] * 5.0
+    mood_scores = base_mood + np.array([-0.3, 0.3])[None, :] + rng.uniform(-0.5, 0.5, (n_days, 2))
+    mood_scores = np.clip(mood_scores, 1.0, 9.5).ravel()  # Clamp to 1-9.5
+    n_entries = mood_scores.size
+    
+    minutes = rng.integers(0, 60, n_entries)
+    
+    # Generate emotions based on mood bucket, normalized to sum to ~1.0
+    bucket = np.digitize(mood_scores, (4.0, 6.0))
+    emotions = np.full((n_entries, len(EMOTION_COLS)), np.nan)
+    for b, ranges in enumerate((_LOW_MOOD_EMOTIONS, _MID_MOOD_EMOTIONS, _HIGH_MOOD_EMOTIONS)):
+        rows = np.flatnonzero(bucket == b)
+        cols, low, high = (np.array(v) for v in zip(*ranges))
+        emotions[rows[:, None], cols] = rng.uniform(low, high, (rows.size, cols.size))
+    emotions /= np.nansum(emotions, axis=1, keepdims=True)
+    
+    # Sentiment confidence (higher for clearly positive/negative moods)
+    polar = (mood_scores >= 6) | (mood_scores <= 4)
+    sentiment_scores = np.where(polar, rng.uniform(0.7, 0.95, n_entries), rng.uniform(0.6, 0.85, n_entries))
+    
+    text_choices = rng.integers(0, 3, n_entries)
+    
+    return mood_scores, emotions, sentiment_scores, minutes, text_choices
+
 
 @router.post("/seed")
 async def seed_demo_data():
@@ -19,123 +93,56 @@ async def seed_demo_data():
     """
     try:
         user_id = "demo_user"
-        
-        # Clear existing demo data
-        if user_id in mood_service.mood_history:
-            mood_service.mood_history[user_id] = []
+        n_days = 14
         
         # Generate 14 days of data (2 entries per day = 28 entries)
-        base_date = datetime.utcnow() - timedelta(days=14)
+        base_date = np.datetime64(datetime.utcnow() - timedelta(days=n_days), "us")
+        mood_scores, emotions, sentiment_scores, minutes, text_choices = _generate_mood_vectors(n_days)
         
-        # Recovery arc: Start low, gradually improve
-        entries = []
+        # Timestamps: morning around 9 AM, afternoon around 3 PM
+        entry = np.arange(mood_scores.size)
+        offsets = (entry // 2) * 1440 + np.where(entry % 2 == 0, 9, 15) * 60 + minutes
+        timestamps = base_date + offsets.astype("timedelta64[m]")
         
-        for day in range(14):
-            # Calculate day progress (0.0 to 1.0)
-            day_progress = day / 13.0
-            
-            # Base mood improves from 2.5 to 7.5 over 14 days
-            base_mood = 2.5 + (day_progress * 5.0)
+        # Only sentiments and texts need per-row Python objects
+        sentiments = []
+        texts = []
+        for i, mood_score in enumerate(mood_scores.tolist()):
+            # Determine sentiment
+            if mood_score >= 6:
+                sentiment_label = "POSITIVE"
+            elif mood_score <= 4:
+                sentiment_label = "NEGATIVE"
+            else:
+                sentiment_label = "NEUTRAL"
+            sentiments.append({
+                "label": sentiment_label,
+                "score": round(float(sentiment_scores[i]), 3),
+                "raw_label": sentiment_label
+            })
             
-            # Add some variation
-            for entry_num in range(2):  # 2 entries per day
-                # Morning entry (slightly lower) or afternoon entry (slightly higher)
-                time_offset = -0.3 if entry_num == 0 else 0.3
-                mood_score = base_mood + time_offset + random.uniform(-0.5, 0.5)
-                mood_score = max(1.0, min(9.5, mood_score))  # Clamp to 1-9.5
-                
-                # Create timestamp (morning around 9 AM, afternoon around 3 PM)
-                hour = 9 if entry_num == 0 else 15
-                minute = random.randint(0, 59)
-                timestamp = base_date + timedelta(days=day, hours=hour, minutes=minute)
-                
-                # Generate emotions based on mood score
-                emotions = {}
-                if mood_score < 4:
-                    emotions = {
-                        "sadness": random.uniform(0.6, 0.9),
-                        "anxiety": random.uniform(0.5, 0.8),
-                        "fear": random.uniform(0.3, 0.6),
-                        "neutral": random.uniform(0.2, 0.4),
-                    }
-                elif mood_score < 6:
-                    emotions = {
-                        "neutral": random.uniform(0.5, 0.7),
-                        "sadness": random.uniform(0.2, 0.4),
-                        "anxiety": random.uniform(0.2, 0.4),
-                        "joy": random.uniform(0.1, 0.3),
-                    }
-                else:
-                    emotions = {
-                        "joy": random.uniform(0.5, 0.8),
-                        "neutral": random.uniform(0.3, 0.5),
-                        "optimism": random.uniform(0.4, 0.7),
-                        "sadness": random.uniform(0.0, 0.2),
-                    }
-                
-                # Normalize emotions to sum to ~1.0
-                total = sum(emotions.values())
-                emotions = {k: v / total for k, v in emotions.items()}
-                
-                # Determine sentiment
-                if mood_score >= 6:
-                    sentiment_label = "POSITIVE"
-                    sentiment_score = random.uniform(0.7, 0.95)
-                elif mood_score <= 4:
-                    sentiment_label = "NEGATIVE"
-                    sentiment_score = random.uniform(0.7, 0.95)
-                else:
-                    sentiment_label = "NEUTRAL"
-                    sentiment_score = random.uniform(0.6, 0.85)
-                
-                # Create sample text based on mood
-                if mood_score < 4:
-                    sample_texts = [
-                        "Feeling really down today. Everything seems overwhelming.",
-                        "Struggling with anxiety and can't seem to shake it off.",
-                        "Having a tough day. Nothing seems to be going right.",
-                    ]
-                elif mood_score < 6:
-                    sample_texts = [
-                        "Feeling okay today. Not great, but managing.",
-                        "It's been an average day. Some ups and downs.",
-                        "Doing alright. Taking things one step at a time.",
-                    ]
-                else:
-                    sample_texts = [
-                        "Feeling really good today! Things are looking up.",
-                        "Had a great day. Feeling positive and energized.",
-                        "Feeling optimistic about the future. Making progress!",
-                    ]
-                
-                entry = {
-                    "timestamp": timestamp.isoformat(),
-                    "mood_score": round(mood_score, 2),
-                    "sentiment": {
-                        "label": sentiment_label,
-                        "score": round(sentiment_score, 3),
-                        "raw_label": sentiment_label
-                    },
-                    "emotions": emotions,
-                    "text": random.choice(sample_texts)
-                }
-                
-                entries.append(entry)
+            # Pick sample text based on mood
+            bucket = 0 if mood_score < 4 else 1 if mood_score < 6 else 2
+            texts.append(SAMPLE_TEXTS[bucket][text_choices[i]])
         
-        # Sort by timestamp
-        entries.sort(key=lambda x: x["timestamp"])
-        
-        # Save to mood service
-        mood_service.mood_history[user_id] = entries
+        # Replace existing demo data with the generated block (entries are already chronological)
+        mood_service.clear_history(user_id)
+        mood_service.append_entries(
+            user_id,
+            timestamps=timestamps,
+            mood_scores=np.round(mood_scores, 2),
+            emotions=emotions,
+            sentiments=sentiments,
+            texts=texts
+        )
         
         return {
             "success": True,
             "message": "Demo data seeded successfully",
-            "entries_created": len(entries),
-            "days_covered": 14,
+            "entries_created": timestamps.size,
+            "days_covered": n_days,
             "user_id": user_id
         }
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error seeding demo data: {str(e)}")
-
@@ -0,0 +1,47 @@
+"""
+Content-Encoding negotiation
+
+Starlette's GZipMiddleware (and a plain substring test) treats any
+Accept-Encoding mentioning "gzip" as consent, even "gzip;q=0", which is an
+explicit refusal. `accepts_gzip` reads the q-values instead.
+"""
+
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.types import Receive, Scope, Send
+
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    """
+    True if an Accept-Encoding header allows gzip (q-values respected)
+    
+    An explicit "gzip" entry wins over "*"; q=0 (or an unparseable q) refuses.
+    """
+    wildcard_q = None
+    for entry in accept_encoding.split(","):
+        coding, _, params = entry.partition(";")
+        coding = coding.strip().lower()
+        if coding not in ("gzip", "*"):
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if coding == "gzip":
+            return q > 0
+        wildcard_q = q
+    return wildcard_q is not None and wildcard_q > 0
+
+
+class NegotiatedGZipMiddleware(GZipMiddleware):
+    """GZipMiddleware that leaves responses uncompressed when the client refuses gzip"""
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and not accepts_gzip(Headers(scope=scope).get("accept-encoding", "")):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
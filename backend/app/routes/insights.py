@@ -2,27 +2,54 @@
 Insights API Routes
 """
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ConfigDict
+from typing import Any, Dict, List, Optional
+import asyncio
 from app.services.mood_service import mood_service
+from app.routes.sharding import verify_user_shard
 from app.services.telus_ai_service import telus_ai_service
 
-router = APIRouter()
+router = APIRouter(dependencies=[Depends(verify_user_shard)])
 
 
-@router.get("/patterns")
+class PatternsResponse(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+    
+    success: bool
+    user_id: str
+    patterns: Dict[str, Any]
+    ai_insight: Optional[str]
+    ai_enhanced: bool
+
+
+class RecommendationsResponse(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+    
+    success: bool
+    user_id: str
+    recommendations: List[Dict[str, Any]]
+    based_on: Dict[str, Any]
+    ai_enhanced: bool
+
+
+@router.get("/patterns", response_model=PatternsResponse)
 async def get_mood_patterns(user_id: str = "default_user"):
     """
     Get identified mood patterns for a user
     Enhanced with TELUS AI Factory (gemma-3-27b) for natural language insights
     """
     try:
-        patterns = mood_service.analyze_patterns(user_id)
-        mood_history = mood_service.get_mood_history(user_id, days=30)
+        patterns, mood_history = await asyncio.gather(
+            asyncio.to_thread(mood_service.analyze_patterns, user_id),
+            asyncio.to_thread(mood_service.get_mood_history, user_id, 30)
+        )
         
         # Generate AI-powered natural language insights
         ai_insight = None
         try:
-            ai_insight = telus_ai_service.generate_pattern_insights(
+            ai_insight = await telus_ai_service.generate_pattern_insights_async(
                 patterns=patterns,
                 mood_history=mood_history
             )
@@ -41,15 +68,17 @@ async def get_mood_patterns(user_id: str = "default_user"):
         raise HTTPException(status_code=500, detail=f"Error analyzing patterns: {str(e)}")
 
 
-@router.get("/recommendations")
+@router.get("/recommendations", response_model=RecommendationsResponse)
 async def get_recommendations(user_id: str = "default_user"):
     """
     Get personalized recommendations based on mood patterns
     Enhanced with TELUS AI Factory (gemma-3-27b) for personalized AI-generated recommendations
     """
     try:
-        patterns = mood_service.analyze_patterns(user_id)
-        mood_history = mood_service.get_mood_history(user_id, days=14)
+        patterns, mood_history = await asyncio.gather(
+            asyncio.to_thread(mood_service.analyze_patterns, user_id),
+            asyncio.to_thread(mood_service.get_mood_history, user_id, 14)
+        )
         
         recommendations = []
         
@@ -62,7 +91,7 @@ async def get_recommendations(user_id: str = "default_user"):
         
         # Generate AI-powered personalized recommendation using gemma-3-27b
         try:
-            ai_recommendation = telus_ai_service.generate_personalized_recommendation(
+            ai_recommendation = await telus_ai_service.generate_personalized_recommendation_async(
                 current_mood=current_mood,
                 mood_history=mood_history,
                 patterns=patterns
@@ -119,4 +148,33 @@ async def get_recommendations(user_id: str = "default_user"):
         raise HTTPException(status_code=500, detail=f"Error generating recommendations: {str(e)}")
 
 
-
+@router.get("/recommendations/stream")
+async def stream_recommendation(user_id: str = "default_user"):
+    """
+    Stream the AI-generated recommendation as plain text while it is generated
+    
+    Same prompt as the AI recommendation in /recommendations, for clients
+    that want to display it word by word instead of waiting for the full text.
+    """
+    try:
+        patterns, mood_history = await asyncio.gather(
+            asyncio.to_thread(mood_service.analyze_patterns, user_id),
+            asyncio.to_thread(mood_service.get_mood_history, user_id, 14)
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error generating recommendations: {str(e)}")
+    
+    # Get current mood (most recent entry)
+    current_mood = mood_history[-1] if mood_history else {
+        "mood_score": 5.0,
+        "sentiment": {"label": "NEUTRAL"},
+        "emotions": {}
+    }
+    
+    # Content-Encoding is set, so GZipMiddleware forwards each chunk as-is
+    # instead of buffering it inside the compressor
+    return StreamingResponse(
+        telus_ai_service.stream_personalized_recommendation(current_mood, patterns),
+        media_type="text/plain",  # Starlette appends "; charset=utf-8"
+        headers={"Content-Encoding": "identity", "Cache-Control": "no-cache"}
+    )
@@ -2,12 +2,18 @@
 Mood Analysis API Routes
 """
 
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException
+from pydantic import BaseModel, ConfigDict
+from typing import Any, Dict, List, Optional
+import asyncio
 import logging
-from app.services.ai_service import ai_service
+from app.services.ai_service import get_ai_service
+from app.services.crisis_keywords import match_crisis_keywords
 from app.services.mood_service import mood_service
+from app.services.telus_ai_service import telus_ai_service
+from app.services import batcher
+from app.routes.sharding import check_user_shard, verify_user_shard
+from app.routes.validation import json_body, json_body_openapi
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -23,8 +29,38 @@ class MoodHistoryRequest(BaseModel):
     days: Optional[int] = 30
 
 
-@router.post("/analyze")
-async def analyze_mood(request: MoodAnalysisRequest):
+class MoodAnalyzeResponse(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+    
+    success: bool
+    mood_analysis: Dict[str, Any]
+    crisis_check: Dict[str, Any]
+    recommendations: List[Dict[str, Any]]
+
+
+class MoodHistoryResponse(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+    
+    success: bool
+    user_id: str
+    days: int
+    entries: List[Dict[str, Any]]
+    total_entries: int
+
+
+class MoodPredictResponse(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+    
+    success: bool
+    user_id: Optional[str]
+    prediction: Dict[str, Any]
+
+
+@router.post("/analyze", response_model=MoodAnalyzeResponse, openapi_extra=json_body_openapi(MoodAnalysisRequest))
+async def analyze_mood(
+    request: MoodAnalysisRequest = Depends(json_body(MoodAnalysisRequest)),
+    x_user_shard: Optional[int] = Header(None)
+):
     """
     Analyze mood from text input using AI models.
     
@@ -39,28 +75,46 @@ async def analyze_mood(request: MoodAnalysisRequest):
         MoodAnalysisResponse with sentiment, emotions, mood score,
         crisis check results, and personalized recommendations.
     """
+    check_user_shard(request.user_id, x_user_shard)
     try:
         # Step 1: Perform AI-powered mood analysis
-        logger.info(f"Analyzing mood for user: {request.user_id}")
-        mood_analysis = ai_service.analyze_mood(request.text)
+        logger.info("Analyzing mood for user: %s", request.user_id)
+        mood_analysis = await batcher.infer(request.text)
         mood_analysis["text"] = request.text
         
         # Step 2: Save to user's mood history
         mood_service.save_mood_entry(request.user_id, mood_analysis)
         
-        # Step 3: Check for crisis indicators (safety-first approach)
-        crisis_check = ai_service.detect_crisis_indicators(request.text, mood_analysis)
+        # Step 3: Check for crisis indicators (safety-first approach). Unless a
+        # high-risk keyword already makes this a crisis, the AI recommendation
+        # is requested at the same time and discarded if a crisis is confirmed,
+        # so the two AI round-trips overlap instead of adding up.
+        keyword_matches = match_crisis_keywords(request.text.lower())
+        ai_rec_task = None
+        if not keyword_matches[0]:
+            ai_rec_task = asyncio.ensure_future(_ai_recommendation(request, mood_analysis))
+        try:
+            crisis_check = await get_ai_service().detect_crisis_indicators_async(
+                request.text, mood_analysis, keyword_matches
+            )
+        except BaseException:
+            if ai_rec_task:
+                ai_rec_task.cancel()
+            raise
         
         # Step 4: Determine if crisis response is needed
         is_crisis = crisis_check.get("requires_immediate_attention") or crisis_check.get("risk_level") in ["HIGH", "CRITICAL"]
         
         # Log crisis detection for monitoring
         if is_crisis:
-            logger.warning(f"CRISIS DETECTED for user {request.user_id}. Risk level: {crisis_check.get('risk_level')}. Showing crisis recommendations only.")
+            logger.warning("CRISIS DETECTED for user %s. Risk level: %s. Showing crisis recommendations only.", request.user_id, crisis_check.get("risk_level"))
         else:
-            logger.info(f"No crisis detected. Risk level: {crisis_check.get('risk_level')}. Showing normal recommendations.")
+            logger.info("No crisis detected. Risk level: %s. Showing normal recommendations.", crisis_check.get("risk_level"))
         
         if is_crisis:
+            if ai_rec_task:
+                ai_rec_task.cancel()
+            
             # CRISIS SITUATION: ONLY show crisis-appropriate recommendations
             # DO NOT show wellness activities like breathing exercises or light exercise
             recommendations = [
@@ -90,29 +144,10 @@ async def analyze_mood(request: MoodAnalysisRequest):
             # Normal situation: Get regular recommendations
             recommendations = _get_recommendations(mood_analysis)
             
-            # Try to enhance with TELUS AI if available (only for non-crisis situations)
-            try:
-                from app.services.telus_ai_service import telus_ai_service
-                
-                # mood_service is already imported at the top of the file
-                patterns = mood_service.analyze_patterns(request.user_id)
-                mood_history = mood_service.get_mood_history(request.user_id, days=14)
-                
-                # Generate AI recommendation (only for non-crisis situations)
-                # Pass user's text for context-aware recommendations
-                ai_rec = telus_ai_service.generate_personalized_recommendation(
-                    current_mood=mood_analysis,
-                    mood_history=mood_history,
-                    patterns=patterns,
-                    is_crisis=False,  # Non-crisis only
-                    user_text=request.text  # Pass user's actual message for context
-                )
-                
-                # Add AI recommendation at the top
+            # Add the TELUS AI recommendation at the top, if one was generated
+            ai_rec = await ai_rec_task
+            if ai_rec is not None:
                 recommendations.insert(0, ai_rec)
-            except Exception as e:
-                # If AI fails, continue with rule-based recommendations
-                logger.warning(f"Could not generate AI recommendation: {e}")
         
         return {
             "success": True,
@@ -124,7 +159,36 @@ async def analyze_mood(request: MoodAnalysisRequest):
         raise HTTPException(status_code=500, detail=f"Error analyzing mood: {str(e)}")
 
 
-@router.get("/history")
+async def _ai_recommendation(request: MoodAnalysisRequest, mood_analysis: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    TELUS AI recommendation for a non-crisis analysis, or None if unavailable
+    
+    Args:
+        request: The analyze request (user id and text)
+        mood_analysis: Mood analysis of the request text
+    """
+    try:
+        # Patterns and history are independent - fetch them concurrently
+        patterns, mood_history = await asyncio.gather(
+            asyncio.to_thread(mood_service.analyze_patterns, request.user_id),
+            asyncio.to_thread(mood_service.get_mood_history, request.user_id, 14)
+        )
+        
+        # Pass user's text for context-aware recommendations
+        return await telus_ai_service.generate_personalized_recommendation_async(
+            current_mood=mood_analysis,
+            mood_history=mood_history,
+            patterns=patterns,
+            is_crisis=False,  # Non-crisis only
+            user_text=request.text  # Pass user's actual message for context
+        )
+    except Exception as e:
+        # If AI fails, continue with rule-based recommendations
+        logger.warning("Could not generate AI recommendation: %s", e)
+        return None
+
+
+@router.get("/history", response_model=MoodHistoryResponse, dependencies=[Depends(verify_user_shard)])
 async def get_mood_history(user_id: str = "default_user", days: int = 30):
     """
     Get mood history for a user
@@ -142,11 +206,15 @@ async def get_mood_history(user_id: str = "default_user", days: int = 30):
         raise HTTPException(status_code=500, detail=f"Error retrieving history: {str(e)}")
 
 
-@router.post("/predict")
-async def predict_mood_trend(request: MoodHistoryRequest):
+@router.post("/predict", response_model=MoodPredictResponse, openapi_extra=json_body_openapi(MoodHistoryRequest))
+async def predict_mood_trend(
+    request: MoodHistoryRequest = Depends(json_body(MoodHistoryRequest)),
+    x_user_shard: Optional[int] = Header(None)
+):
     """
     Predict future mood trends based on historical data
     """
+    check_user_shard(request.user_id, x_user_shard)
     try:
         prediction = mood_service.predict_mood_trend(request.user_id)
         return {
@@ -158,58 +226,65 @@ async def predict_mood_trend(request: MoodHistoryRequest):
         raise HTTPException(status_code=500, detail=f"Error predicting mood: {str(e)}")
 
 
+# Rule-based recommendations (shared, read-only - never mutate these dicts)
+REC_DEEP_BREATHING = {
+    "type": "WELLNESS",
+    "title": "Practice Deep Breathing",
+    "description": "Take 5 deep breaths to help calm your mind",
+    "priority": "HIGH"
+}
+REC_LIGHT_EXERCISE = {
+    "type": "ACTIVITY",
+    "title": "Light Exercise",
+    "description": "A short walk or gentle movement can improve mood",
+    "priority": "MEDIUM"
+}
+REC_GROUNDING = {
+    "type": "TECHNIQUE",
+    "title": "Grounding Exercise",
+    "description": "Name 5 things you can see, 4 you can touch, 3 you can hear, 2 you can smell, 1 you can taste",
+    "priority": "HIGH"
+}
+REC_REACH_OUT = {
+    "type": "SUPPORT",
+    "title": "Reach Out",
+    "description": "Consider talking to a friend, family member, or mental health professional",
+    "priority": "MEDIUM"
+}
+REC_MAINTAIN = {
+    "type": "MAINTENANCE",
+    "title": "Maintain Positive Habits",
+    "description": "Keep doing what's working for you!",
+    "priority": "LOW"
+}
+REC_GENERAL = {
+    "type": "GENERAL",
+    "title": "Stay Mindful",
+    "description": "Continue tracking your mood and patterns",
+    "priority": "LOW"
+}
+
+# (predicate(mood_score, anxiety, sadness), recommendation) in display order
+_RULES = (
+    (lambda score, anxiety, sadness: score < 4.0, REC_DEEP_BREATHING),
+    (lambda score, anxiety, sadness: score < 4.0, REC_LIGHT_EXERCISE),
+    (lambda score, anxiety, sadness: anxiety > 0.6, REC_GROUNDING),
+    (lambda score, anxiety, sadness: sadness > 0.6, REC_REACH_OUT),
+    (lambda score, anxiety, sadness: score > 7.0, REC_MAINTAIN),
+)
+
+
 def _get_recommendations(mood_analysis: dict) -> list:
     """Generate personalized recommendations based on mood analysis"""
-    recommendations = []
     mood_score = mood_analysis.get("mood_score", 5.0)
     emotions = mood_analysis.get("emotions", {})
+    anxiety = emotions.get("anxiety", 0)
+    sadness = emotions.get("sadness", 0)
     
-    if mood_score < 4.0:
-        recommendations.append({
-            "type": "WELLNESS",
-            "title": "Practice Deep Breathing",
-            "description": "Take 5 deep breaths to help calm your mind",
-            "priority": "HIGH"
-        })
-        recommendations.append({
-            "type": "ACTIVITY",
-            "title": "Light Exercise",
-            "description": "A short walk or gentle movement can improve mood",
-            "priority": "MEDIUM"
-        })
-    
-    if emotions.get("anxiety", 0) > 0.6:
-        recommendations.append({
-            "type": "TECHNIQUE",
-            "title": "Grounding Exercise",
-            "description": "Name 5 things you can see, 4 you can touch, 3 you can hear, 2 you can smell, 1 you can taste",
-            "priority": "HIGH"
-        })
-    
-    if emotions.get("sadness", 0) > 0.6:
-        recommendations.append({
-            "type": "SUPPORT",
-            "title": "Reach Out",
-            "description": "Consider talking to a friend, family member, or mental health professional",
-            "priority": "MEDIUM"
-        })
-    
-    if mood_score > 7.0:
-        recommendations.append({
-            "type": "MAINTENANCE",
-            "title": "Maintain Positive Habits",
-            "description": "Keep doing what's working for you!",
-            "priority": "LOW"
-        })
+    recommendations = [rec for rule, rec in _RULES if rule(mood_score, anxiety, sadness)]
     
     # Default recommendations if none match
     if not recommendations:
-        recommendations.append({
-            "type": "GENERAL",
-            "title": "Stay Mindful",
-            "description": "Continue tracking your mood and patterns",
-            "priority": "LOW"
-        })
+        recommendations.append(REC_GENERAL)
     
     return recommendations
-
@@ -0,0 +1,42 @@
+"""
+User shard checks for per-user routes
+
+With SHARD_COUNT > 1 each backend process owns the users whose
+`shard_for(user_id)` equals its WORKER_SHARD. The front proxy routes on
+that index and sends it as X-User-Shard; workers verify both the header
+and the user_id itself, so a user's history is never read or written by
+the wrong process.
+"""
+
+from typing import Optional
+from fastapi import Header, HTTPException
+from app.services.mood_service import shard_for, SHARD_COUNT, WORKER_SHARD
+
+
+def check_user_shard(user_id: Optional[str], x_user_shard: Optional[int]):
+    """
+    Reject a request for a user this worker does not own
+
+    Args:
+        user_id: User the request reads or writes
+        x_user_shard: Shard index sent by the proxy (X-User-Shard)
+
+    Raises:
+        HTTPException: 400 if the header is missing, 421 if the header or
+            the user's shard is not this worker's
+    """
+    if SHARD_COUNT == 1:
+        return
+    if x_user_shard is None:
+        raise HTTPException(status_code=400, detail="X-User-Shard header is required when sharding is enabled")
+    user_shard = shard_for(user_id or "")
+    if x_user_shard != WORKER_SHARD or user_shard != WORKER_SHARD:
+        raise HTTPException(
+            status_code=421,
+            detail=f"User shard {user_shard} is not served by worker {WORKER_SHARD}"
+        )
+
+
+async def verify_user_shard(user_id: str = "default_user", x_user_shard: Optional[int] = Header(None)):
+    """Route dependency running `check_user_shard` for a user_id query parameter"""
+    check_user_shard(user_id, x_user_shard)
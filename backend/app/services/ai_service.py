@@ -12,27 +12,239 @@ PRIVACY & COMPLIANCE:
 This ensures compliance with healthcare data protection regulations.
 """
 
-from transformers import pipeline
+import os
+
+# Requests already run tokenization on pool threads; keep the Rust tokenizer
+# from spawning its own thread pool per call (and from warning after fork).
+# Must be set before transformers/tokenizers are imported.
+os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+
+from transformers import AutoModelForSequenceClassification, AutoTokenizer
 import torch
-from typing import Dict, List, Any
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, List, Any, Optional, Tuple
+import copy
+import hashlib
 import logging
+import threading
+import time
+from app.services.crisis_keywords import match_crisis_keywords
+
+# ONNX Runtime backend is optional (pip install optimum[onnxruntime])
+try:
+    from optimum.onnxruntime import ORTModelForSequenceClassification, ORTOptimizer, ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig, OptimizationConfig
+    import onnxruntime as ort
+    ONNX_AVAILABLE = True
+except ImportError:
+    ONNX_AVAILABLE = False
 
 logger = logging.getLogger(__name__)
 
-# Lazy import to avoid circular dependency
-_telus_ai_service = None
+# Local models (both RoBERTa-based, sharing one tokenizer)
+SENTIMENT_MODEL = "cardiffnlp/twitter-roberta-base-sentiment-latest"
+EMOTION_MODEL = "j-hartmann/emotion-english-distilroberta-base"
+MODEL_MAX_LENGTH = 512  # RoBERTa position limit (514 embeddings, minus special offset)
+
+# Model inputs are truncated to this many tokens. Mood is carried by the start
+# of a chat message, and attention cost grows quadratically with length.
+# Crisis keyword scans always see the full text.
+MAX_SEQ_LENGTH = min(int(os.getenv("MAX_SEQ_LENGTH", "128")), MODEL_MAX_LENGTH)
+
+# Warmup input of typical message length, so compiled graphs match real traffic
+WARMUP_TEXT = "I've been feeling a bit overwhelmed with work lately, but talking to friends helps."
+
+# Exported, graph-optimized + INT8-quantized ONNX models are cached here across restarts
+ONNX_CACHE_DIR = os.path.expanduser(os.getenv("ONNX_CACHE_DIR", "~/.cache/wonderofus/onnx"))
+ONNX_OPTIMIZED_FILE = "model_optimized.onnx"
+ONNX_QUANTIZED_FILE = "model_optimized_quantized.onnx"
+
+# Emotions that raise / lower the mood score
+POSITIVE_EMOTIONS = frozenset({"joy", "love", "optimism", "pride", "amusement"})
+NEGATIVE_EMOTIONS = frozenset({"sadness", "anger", "fear", "disgust", "disappointment"})
+
+# Mood score contribution per unit of emotion confidence (others contribute 0)
+EMOTION_WEIGHTS = {
+    **{emotion: 2.0 for emotion in POSITIVE_EMOTIONS},
+    **{emotion: -2.0 for emotion in NEGATIVE_EMOTIONS}
+}
+
+
+@lru_cache(maxsize=64)
+def normalize_sentiment_label(label: str) -> Tuple[str, str]:
+    """
+    Map a raw sentiment label onto POSITIVE/NEGATIVE/NEUTRAL
+    
+    Models only emit a handful of distinct labels, so each is resolved once
+    and later calls are a cache lookup.
+    
+    Returns:
+        Tuple of (normalized sentiment, uppercased raw label)
+    """
+    label = label.upper()
+    if 'POS' in label:
+        return "POSITIVE", label
+    if 'NEG' in label:
+        return "NEGATIVE", label
+    return "NEUTRAL", label
+
+# Crisis resources: emergency services (HIGH risk only), an emotion-specific
+# resource, then general resources
+EMERGENCY_RESOURCE = {
+    "name": "Emergency Services",
+    "phone": "911",
+    "text": "Call immediately if in immediate danger",
+    "available": "24/7",
+    "priority": "IMMEDIATE",
+    "description": "Call 911 immediately if you or someone else is in immediate danger"
+}
+EMOTION_CRISIS_RESOURCES = {
+    "anxiety": {
+        "name": "Anxiety Canada",
+        "phone": "1-604-620-0744",
+        "website": "https://www.anxietycanada.com/",
+        "available": "24/7",
+        "description": "Specialized support for anxiety and panic disorders"
+    },
+    "depression": {
+        "name": "Crisis Services Canada",
+        "phone": "1-833-456-4566",
+        "text": "45645",
+        "website": "https://www.crisisservicescanada.ca/",
+        "available": "24/7",
+        "description": "Free, confidential support for depression and mental health crises"
+    }
+}
+GENERAL_CRISIS_RESOURCES = (
+    {
+        "name": "Crisis Services Canada",
+        "phone": "1-833-456-4566",
+        "text": "45645",
+        "website": "https://www.crisisservicescanada.ca/",
+        "available": "24/7",
+        "description": "Free, confidential support for anyone in Canada"
+    },
+    {
+        "name": "Kids Help Phone",
+        "phone": "1-800-668-6868",
+        "text": "686868",
+        "website": "https://kidshelpphone.ca/",
+        "available": "24/7",
+        "description": "Support for youth under 20"
+    }
+)
+
+
+def _build_crisis_resources(high_risk: bool, emotion_type: Optional[str]) -> Tuple[Dict[str, str], ...]:
+    """Ordered resource list for one (high_risk, emotion_type) combination, first entry per name kept"""
+    resources = [EMERGENCY_RESOURCE] if high_risk else []
+    if emotion_type in EMOTION_CRISIS_RESOURCES:
+        resources.append(EMOTION_CRISIS_RESOURCES[emotion_type])
+    resources.extend(GENERAL_CRISIS_RESOURCES)
+    
+    # Remove duplicates (in case emotion-specific resource matches general)
+    unique_resources = {}
+    for resource in resources:
+        unique_resources.setdefault(resource["name"], resource)
+    return tuple(unique_resources.values())
+
+
+# (risk_level == "HIGH", emotion_type or None) -> resources
+CRISIS_RESOURCE_TABLE = {
+    (high_risk, emotion_type): _build_crisis_resources(high_risk, emotion_type)
+    for high_risk in (True, False)
+    for emotion_type in (None, *EMOTION_CRISIS_RESOURCES)
+}
+
 
+# Mood analysis cache: repeated identical texts skip inference entirely
+# (entries are ~1 KB, so the default costs a few MB; MOOD_CACHE_SIZE=0 disables it)
+MOOD_CACHE_SIZE = int(os.getenv("MOOD_CACHE_SIZE", "4096"))
+MOOD_CACHE_TTL = float(os.getenv("MOOD_CACHE_TTL", "600"))  # seconds
+
+@lru_cache(maxsize=1)
 def get_telus_ai_service():
-    """Lazy load TELUS AI service to avoid circular imports"""
-    global _telus_ai_service
-    if _telus_ai_service is None:
-        try:
-            from app.services.telus_ai_service import telus_ai_service
-            _telus_ai_service = telus_ai_service
-        except Exception as e:
-            logger.warning(f"Could not load TELUS AI service: {e}")
-            _telus_ai_service = None
-    return _telus_ai_service
+    """
+    Lazy load TELUS AI service to avoid circular imports
+    
+    The lookup is memoized, including a failed import (None), so a missing
+    service is reported once instead of being retried on every request.
+    """
+    try:
+        from app.services.telus_ai_service import telus_ai_service
+        return telus_ai_service
+    except Exception as e:
+        logger.warning(f"Could not load TELUS AI service: {e}")
+        return None
+
+class MoodCache:
+    """
+    Thread-safe LRU cache of mood analyses with a TTL
+    
+    Keyed by a BLAKE2b digest of the text so the cache never holds raw user
+    text as keys. Callers always receive a deep copy, since routes annotate
+    the returned analysis in place.
+    """
+    
+    def __init__(self, maxsize: int = MOOD_CACHE_SIZE, ttl: float = MOOD_CACHE_TTL):
+        """Initialize an empty cache"""
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[bytes, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    @staticmethod
+    def _key(text: str) -> bytes:
+        """Digest of the exact input text (the models are case-sensitive)"""
+        return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+    
+    def get(self, text: str) -> Optional[Dict[str, Any]]:
+        """Return a copy of the cached analysis for `text`, or None"""
+        key = self._key(text)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            analysis = entry[1]
+        return copy.deepcopy(analysis)
+    
+    def put(self, text: str, analysis: Dict[str, Any]):
+        """Cache a copy of `analysis`, unless it came from a failed model call"""
+        if "error" in analysis.get("sentiment", {}) or "error" in analysis.get("emotions", {}):
+            return
+        if self.maxsize <= 0:
+            return
+        key = self._key(text)
+        entry = (time.monotonic() + self.ttl, copy.deepcopy(analysis))
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+    
+    def clear(self):
+        """Drop all cached analyses"""
+        with self._lock:
+            self._entries.clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Cache size and hit/miss counters (for /health/caches)"""
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
 
 class AIService:
     """
@@ -49,8 +261,6 @@ class AIService:
         Models are loaded on-demand to reduce memory usage.
         Models run locally - no data sent to external services.
         """
-        import os
-        
         # Check if we should disable local models (for free tier memory constraints)
         # Default to False (disabled) for free tier to prevent OOM errors
         use_local_models_env = os.getenv("USE_LOCAL_MODELS", "false")
@@ -59,13 +269,20 @@ class AIService:
         logger.info(f"USE_LOCAL_MODELS environment variable: '{use_local_models_env}'")
         logger.info(f"Local models enabled: {self.use_local_models}")
         
+        # Results are cached per text for both local and Gemini analysis
+        self.mood_cache = MoodCache()
+        
+        # Serializes lazy loads, so concurrent first requests load each model once
+        self._load_lock = threading.Lock()
+        
         if not self.use_local_models:
             logger.info("=" * 60)
             logger.info("MEMORY OPTIMIZATION: Local models DISABLED")
             logger.info("Using Gemini API only (fits in 512MB free tier)")
             logger.info("=" * 60)
-            self._sentiment_analyzer = None
-            self._emotion_analyzer = None
+            self._tokenizer = None
+            self._sentiment_model = None
+            self._emotion_model = None
             return
         
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
@@ -73,54 +290,265 @@ class AIService:
         
         # Lazy loading - models loaded on first use to save memory
         # This prevents OOM errors on free tier (512MB limit)
-        self._sentiment_analyzer = None
-        self._emotion_analyzer = None
+        self._tokenizer = None
+        self._sentiment_model = None
+        self._emotion_model = None
+        
+        # Weight precision: bfloat16 halves memory traffic per forward pass on
+        # CPUs with native BF16 support; float32 (default) is safest elsewhere
+        dtype_env = os.getenv("MODEL_DTYPE", "float32").lower()
+        if dtype_env == "float16":
+            # Models always run on CPU, where float16 kernels are slow or missing
+            logger.warning("MODEL_DTYPE=float16 is not supported on CPU, using bfloat16")
+            dtype_env = "bfloat16"
+        self.dtype = torch.bfloat16 if dtype_env == "bfloat16" else torch.float32
+        logger.info(f"Model weight dtype: {self.dtype}")
+        
+        # Optionally run the models as INT8-quantized ONNX graphs (CPU)
+        self.use_onnx = os.getenv("USE_ONNX", "false").lower() in ("true", "1", "yes")
+        if self.use_onnx and not ONNX_AVAILABLE:
+            logger.warning("USE_ONNX is set but optimum[onnxruntime] is not installed, using PyTorch")
+            self.use_onnx = False
+        
+        # Optionally quantize the PyTorch models' Linear layers to INT8 (dynamic)
+        self.quantize_int8 = os.getenv("QUANTIZE_INT8", "false").lower() in ("true", "1", "yes")
+        if self.quantize_int8 and self.dtype != torch.float32:
+            logger.warning("QUANTIZE_INT8 requires float32 weights, ignoring MODEL_DTYPE")
+            self.dtype = torch.float32
         
         # Force CPU mode to save memory (no CUDA on free tier anyway)
-        torch.set_num_threads(1)  # Limit CPU threads to reduce memory
+        # Limit CPU threads to reduce memory; raise TORCH_NUM_THREADS on larger hosts.
+        # The same budget applies to ONNX Runtime sessions.
+        self.num_threads = int(os.getenv("TORCH_NUM_THREADS", "1"))
+        torch.set_num_threads(self.num_threads)
         logger.info("AI Service initialized with lazy model loading (memory optimized)")
     
+    def _load_model(self, model_name: str, kind: str):
+        """Load a sequence classification model for CPU inference, or None on failure"""
+        if self.use_onnx:
+            try:
+                logger.info(f"Loading {kind} model (ONNX Runtime, INT8)...")
+                model = self._load_onnx_model(model_name)
+                logger.info(f"{kind.capitalize()} ONNX model loaded successfully")
+                return model
+            except Exception as e:
+                logger.warning(f"Could not load {kind} ONNX model, using PyTorch: {e}")
+        
+        try:
+            logger.info(f"Loading {kind} model...")
+            load_kwargs = {
+                "torch_dtype": self.dtype,
+                "low_cpu_mem_usage": True  # Load weights straight into place, no extra full copy
+            }
+            try:
+                # Fused scaled-dot-product attention kernels
+                model = AutoModelForSequenceClassification.from_pretrained(
+                    model_name, attn_implementation="sdpa", **load_kwargs
+                )
+            except (ValueError, ImportError) as e:
+                # Older transformers/torch without SDPA support for this architecture
+                logger.info(f"SDPA attention unavailable for {kind} model, using default: {e}")
+                model = AutoModelForSequenceClassification.from_pretrained(model_name, **load_kwargs)
+            model.eval()
+            if self.quantize_int8:
+                model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+            logger.info(f"{kind.capitalize()} model loaded successfully")
+            return model
+        except Exception as e:
+            logger.warning(f"Could not load {kind} model: {e}")
+            return None
+    
+    def _load_onnx_model(self, model_name: str):
+        """
+        Load the INT8-quantized ONNX export of a model
+        
+        The first load exports the checkpoint to ONNX, applies all graph
+        optimizations (including transformer-specific attention/GELU/LayerNorm
+        fusions) and then per-channel dynamic INT8 quantization; the result is
+        cached under ONNX_CACHE_DIR so later process starts load it directly.
+        """
+        cache_dir = os.path.join(ONNX_CACHE_DIR, model_name.replace("/", "--"))
+        if not os.path.exists(os.path.join(cache_dir, ONNX_QUANTIZED_FILE)):
+            logger.info(f"Exporting {model_name} to ONNX (one-time)...")
+            model = ORTModelForSequenceClassification.from_pretrained(model_name, export=True)
+            model.save_pretrained(cache_dir)
+            optimizer = ORTOptimizer.from_pretrained(model)
+            optimizer.optimize(
+                save_dir=cache_dir,
+                optimization_config=OptimizationConfig(optimization_level=99)
+            )
+            quantizer = ORTQuantizer.from_pretrained(cache_dir, file_name=ONNX_OPTIMIZED_FILE)
+            quantizer.quantize(
+                save_dir=cache_dir,
+                quantization_config=AutoQuantizationConfig.avx512_vnni(is_static=False, per_channel=True)
+            )
+        return ORTModelForSequenceClassification.from_pretrained(
+            cache_dir,
+            file_name=ONNX_QUANTIZED_FILE,
+            session_options=self._onnx_session_options()
+        )
+    
+    def _onnx_session_options(self):
+        """
+        ONNX Runtime session options for small-batch request latency
+        
+        Each request's forward pass runs its ops sequentially on a single
+        intra-op pool sized like the PyTorch thread budget; concurrency comes
+        from the inference executor, not from inter-op parallelism.
+        """
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = self.num_threads
+        options.inter_op_num_threads = 1
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        return options
+    
     @property
-    def sentiment_analyzer(self):
-        """Lazy load sentiment analyzer on first use"""
+    def tokenizer(self):
+        """
+        Lazy load the shared tokenizer on first use
+        
+        Both models are RoBERTa fine-tunes with the same BPE vocabulary, so
+        one tokenization feeds both forward passes.
+        """
         if not self.use_local_models:
             return None  # Disabled for memory optimization
         
-        if self._sentiment_analyzer is None:
-            try:
-                logger.info("Loading sentiment analysis model...")
-                self._sentiment_analyzer = pipeline(
-                    "sentiment-analysis",
-                    model="cardiffnlp/twitter-roberta-base-sentiment-latest",
-                    device=-1,  # Always use CPU to save memory
-                    torch_dtype=torch.float32
-                )
-                logger.info("Sentiment model loaded successfully")
-            except Exception as e:
-                logger.warning(f"Could not load sentiment model: {e}")
-                self._sentiment_analyzer = None
-        return self._sentiment_analyzer
+        if self._tokenizer is None:
+            with self._load_lock:
+                if self._tokenizer is None:
+                    try:
+                        self._tokenizer = AutoTokenizer.from_pretrained(SENTIMENT_MODEL)
+                    except Exception as e:
+                        logger.warning(f"Could not load tokenizer: {e}")
+                        self._tokenizer = None
+        return self._tokenizer
     
     @property
-    def emotion_analyzer(self):
-        """Lazy load emotion analyzer on first use"""
+    def sentiment_model(self):
+        """Lazy load sentiment model on first use"""
         if not self.use_local_models:
             return None  # Disabled for memory optimization
         
-        if self._emotion_analyzer is None:
-            try:
-                logger.info("Loading emotion detection model...")
-                self._emotion_analyzer = pipeline(
-                    "text-classification",
-                    model="j-hartmann/emotion-english-distilroberta-base",
-                    device=-1,  # Always use CPU to save memory
-                    torch_dtype=torch.float32
-                )
-                logger.info("Emotion model loaded successfully")
-            except Exception as e:
-                logger.warning(f"Could not load emotion model: {e}")
-                self._emotion_analyzer = None
-        return self._emotion_analyzer
+        if self._sentiment_model is None:
+            with self._load_lock:
+                if self._sentiment_model is None:
+                    self._sentiment_model = self._load_model(SENTIMENT_MODEL, "sentiment analysis")
+        return self._sentiment_model
+    
+    @property
+    def emotion_model(self):
+        """Lazy load emotion model on first use"""
+        if not self.use_local_models:
+            return None  # Disabled for memory optimization
+        
+        if self._emotion_model is None:
+            with self._load_lock:
+                if self._emotion_model is None:
+                    self._emotion_model = self._load_model(EMOTION_MODEL, "emotion detection")
+        return self._emotion_model
+    
+    def preload_models(self) -> bool:
+        """
+        Load the local models and run one warmup batch
+        
+        Called at startup so the first user request doesn't pay for model
+        loading, and so the runtime allocates its working memory before
+        real traffic arrives.
+        
+        Returns:
+            True if the local models are loaded and warmed up
+        """
+        if not self._local_models_ready():
+            return False
+        try:
+            self._classify([WARMUP_TEXT])
+            logger.info("Local models loaded and warmed up")
+            return True
+        except Exception as e:
+            logger.warning(f"Model warmup failed: {e}")
+            return False
+    
+    def compile_models(self) -> bool:
+        """
+        Compile the local models with torch.compile and warm them up
+        
+        Loads the models if needed, wraps them in torch.compile
+        (mode="reduce-overhead") and runs one dummy batch so compilation
+        happens now rather than on the first user request. Leaves the
+        eager models in place if compilation is unavailable or fails.
+        
+        Returns:
+            True if the compiled models are in use
+        """
+        if not self._local_models_ready():
+            logger.info("Skipping model compilation: local models not available")
+            return False
+        if self.use_onnx and not isinstance(self._sentiment_model, torch.nn.Module):
+            logger.info("Skipping model compilation: models run on ONNX Runtime")
+            return False
+        if not hasattr(torch, "compile"):
+            logger.warning("Skipping model compilation: torch.compile requires PyTorch 2.0+")
+            return False
+        
+        sentiment_model, emotion_model = self._sentiment_model, self._emotion_model
+        try:
+            logger.info("Compiling local models (this can take a minute per model)...")
+            self._sentiment_model = torch.compile(sentiment_model, mode="reduce-overhead")
+            self._emotion_model = torch.compile(emotion_model, mode="reduce-overhead")
+            self._classify([WARMUP_TEXT])
+            logger.info("Local models compiled and warmed up")
+            return True
+        except Exception as e:
+            logger.warning(f"Model compilation failed, using eager models: {e}")
+            self._sentiment_model, self._emotion_model = sentiment_model, emotion_model
+            return False
+    
+    def _classify(
+        self,
+        texts: List[str],
+        sentiment: bool = True,
+        emotions: bool = True
+    ) -> Tuple[Optional[List[Dict[str, Any]]], Optional[List[Dict[str, float]]]]:
+        """
+        Run the local models over `texts` with a single tokenization
+        
+        Args:
+            texts: Input texts to classify
+            sentiment: Run the sentiment model
+            emotions: Run the emotion model
+            
+        Returns:
+            Tuple of (raw sentiment results with top label and score,
+            emotion score dicts); an entry is None if its model wasn't run
+        """
+        encoded = self.tokenizer(
+            texts,
+            return_tensors="pt",
+            truncation=True,
+            max_length=MAX_SEQ_LENGTH,
+            padding=True
+        )
+        
+        sentiment_results = None
+        emotion_results = None
+        # Softmax always runs in float32, whatever the weight dtype
+        with torch.inference_mode():
+            if sentiment:
+                model = self.sentiment_model
+                probs = torch.softmax(model(**encoded).logits.float(), dim=-1)
+                scores, labels = probs.max(dim=-1)
+                sentiment_results = [
+                    {"label": model.config.id2label[label], "score": score}
+                    for label, score in zip(labels.tolist(), scores.tolist())
+                ]
+            if emotions:
+                model = self.emotion_model
+                probs = torch.softmax(model(**encoded).logits.float(), dim=-1)
+                names = [model.config.id2label[i].lower() for i in range(probs.shape[-1])]
+                emotion_results = [dict(zip(names, row)) for row in probs.tolist()]
+        
+        return sentiment_results, emotion_results
     
     def analyze_sentiment(self, text: str) -> Dict[str, Any]:
         """
@@ -136,7 +564,7 @@ class AIService:
         if not self.use_local_models:
             return self._analyze_sentiment_with_gemini(text)
         
-        if not self.sentiment_analyzer:
+        if not self.tokenizer or not self.sentiment_model:
             return {
                 "label": "NEUTRAL",
                 "score": 0.5,
@@ -144,23 +572,8 @@ class AIService:
             }
         
         try:
-            result = self.sentiment_analyzer(text)[0]
-            label = result['label'].upper()
-            score = result['score']
-            
-            # Normalize labels
-            if 'POSITIVE' in label or 'POS' in label:
-                sentiment = "POSITIVE"
-            elif 'NEGATIVE' in label or 'NEG' in label:
-                sentiment = "NEGATIVE"
-            else:
-                sentiment = "NEUTRAL"
-            
-            return {
-                "label": sentiment,
-                "score": float(score),
-                "raw_label": label
-            }
+            sentiment_results, _ = self._classify([text], emotions=False)
+            return self._normalize_sentiment(sentiment_results[0])
         except Exception as e:
             logger.error(f"Error in sentiment analysis: {e}")
             return {
@@ -169,6 +582,16 @@ class AIService:
                 "error": str(e)
             }
     
+    def _normalize_sentiment(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Map a raw sentiment pipeline result onto POSITIVE/NEGATIVE/NEUTRAL"""
+        sentiment, label = normalize_sentiment_label(result['label'])
+        
+        return {
+            "label": sentiment,
+            "score": float(result['score']),
+            "raw_label": label
+        }
+    
     def detect_emotions(self, text: str) -> Dict[str, float]:
         """
         Detect emotions in input text
@@ -183,22 +606,15 @@ class AIService:
         if not self.use_local_models:
             return self._detect_emotions_with_gemini(text)
         
-        if not self.emotion_analyzer:
+        if not self.tokenizer or not self.emotion_model:
             return {
                 "neutral": 1.0,
                 "error": "Model not loaded"
             }
         
         try:
-            results = self.emotion_analyzer(text, top_k=None)
-            emotions = {}
-            
-            for result in results:
-                emotion = result['label'].lower()
-                score = result['score']
-                emotions[emotion] = float(score)
-            
-            return emotions
+            _, emotion_results = self._classify([text], sentiment=False)
+            return emotion_results[0]
         except Exception as e:
             logger.error(f"Error in emotion detection: {e}")
             return {
@@ -208,6 +624,7 @@ class AIService:
     
     def _analyze_sentiment_with_gemini(self, text: str) -> Dict[str, Any]:
         """Use Gemini API for sentiment analysis when local models disabled"""
+        error = "Gemini unavailable"
         try:
             telus_service = get_telus_ai_service()
             if telus_service and telus_service.gemini_available and telus_service.gemini_model:
@@ -233,14 +650,17 @@ Format: SENTIMENT|SCORE"""
                         label = "NEUTRAL"
                     
                     return {"label": label, "score": score}
+                error = "Unparseable Gemini response"
         except Exception as e:
             logger.warning(f"Gemini sentiment analysis failed: {e}")
+            error = str(e)
         
-        # Fallback
-        return {"label": "NEUTRAL", "score": 0.5}
+        # Fallback, tagged like the local model's so it is never cached
+        return {"label": "NEUTRAL", "score": 0.5, "error": error}
     
     def _detect_emotions_with_gemini(self, text: str) -> Dict[str, float]:
         """Use Gemini API for emotion detection when local models disabled"""
+        error = "Gemini unavailable"
         try:
             telus_service = get_telus_ai_service()
             if telus_service and telus_service.gemini_available and telus_service.gemini_model:
@@ -262,11 +682,13 @@ Emotions to consider: joy, sadness, anger, fear, surprise, disgust, neutral"""
                 
                 if emotions:
                     return emotions
+                error = "Unparseable Gemini response"
         except Exception as e:
             logger.warning(f"Gemini emotion detection failed: {e}")
+            error = str(e)
         
-        # Fallback
-        return {"neutral": 1.0}
+        # Fallback, tagged like the local model's so it is never cached
+        return {"neutral": 1.0, "error": error}
     
     def analyze_mood(self, text: str) -> Dict[str, Any]:
         """
@@ -278,9 +700,67 @@ Emotions to consider: joy, sadness, anger, fear, surprise, disgust, neutral"""
         Returns:
             Complete mood analysis with sentiment, emotions, and mood score
         """
-        sentiment = self.analyze_sentiment(text)
-        emotions = self.detect_emotions(text)
+        cached = self.mood_cache.get(text)
+        if cached is not None:
+            return cached
+        
+        analysis = self._analyze_uncached([text])[0]
+        self.mood_cache.put(text, analysis)
+        return analysis
+    
+    def analyze_mood_batch(self, texts: List[str]) -> List[Dict[str, Any]]:
+        """
+        Mood analysis for several texts in one pass
+        
+        The texts not already cached are tokenized once and each local model
+        runs once over them, so concurrent requests share a single forward
+        pass instead of one per text.
         
+        Args:
+            texts: Input texts to analyze
+            
+        Returns:
+            Mood analyses in the same order as the input texts
+        """
+        analyses = [self.mood_cache.get(text) for text in texts]
+        misses = [i for i, analysis in enumerate(analyses) if analysis is None]
+        if not misses:
+            return analyses
+        
+        for i, analysis in zip(misses, self._analyze_uncached([texts[i] for i in misses])):
+            analyses[i] = analysis
+            self.mood_cache.put(texts[i], analysis)
+        return analyses
+    
+    def _analyze_uncached(self, texts: List[str]) -> List[Dict[str, Any]]:
+        """
+        Analyze texts without consulting the cache
+        
+        Uses one fused pass through the local models when they are loaded;
+        otherwise (or if that fails) analyzes each text separately, which
+        goes through Gemini when local models are disabled.
+        """
+        if self._local_models_ready():
+            try:
+                sentiment_results, emotion_results = self._classify(texts)
+                return [
+                    self._build_mood_analysis(text, self._normalize_sentiment(sentiment_result), emotions)
+                    for text, sentiment_result, emotions in zip(texts, sentiment_results, emotion_results)
+                ]
+            except Exception as e:
+                logger.error(f"Error in fused mood analysis: {e}")
+        
+        return [
+            self._build_mood_analysis(text, self.analyze_sentiment(text), self.detect_emotions(text))
+            for text in texts
+        ]
+    
+    def _local_models_ready(self) -> bool:
+        """True if local inference is enabled and the tokenizer and both models loaded"""
+        return bool(self.use_local_models and self.tokenizer and self.sentiment_model and self.emotion_model)
+    
+    def _build_mood_analysis(self, text: str, sentiment: Dict[str, Any], emotions: Dict[str, float]) -> Dict[str, Any]:
+        """Combine sentiment and emotions into a mood analysis with a 0-10 mood score"""
         # Calculate mood score (0-10, where 5 is neutral)
         mood_score = 5.0
         
@@ -290,15 +770,11 @@ Emotions to consider: joy, sadness, anger, fear, surprise, disgust, neutral"""
         elif sentiment["label"] == "NEGATIVE":
             mood_score -= sentiment["score"] * 3
         
-        # Adjust based on emotions
-        positive_emotions = ["joy", "love", "optimism", "pride", "amusement"]
-        negative_emotions = ["sadness", "anger", "fear", "disgust", "disappointment"]
-        
-        for emotion, score in emotions.items():
-            if emotion in positive_emotions:
-                mood_score += score * 2
-            elif emotion in negative_emotions:
-                mood_score -= score * 2
+        # Adjust based on emotions: one weight lookup per weighted emotion (other
+        # keys, like a fallback's "error" message, are skipped)
+        mood_score += sum(
+            EMOTION_WEIGHTS[emotion] * score for emotion, score in emotions.items() if emotion in EMOTION_WEIGHTS
+        )
         
         # Clamp mood score between 0 and 10
         mood_score = max(0, min(10, mood_score))
@@ -310,7 +786,49 @@ Emotions to consider: joy, sadness, anger, fear, surprise, disgust, neutral"""
             "text_length": len(text)
         }
     
-    def detect_crisis_indicators(self, text: str, mood_analysis: Dict[str, Any]) -> Dict[str, Any]:
+    def quick_crisis_check(
+        self,
+        text: str,
+        keyword_matches: Optional[Tuple[Optional[str], Optional[str]]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Keyword-only crisis check that needs no model inference
+        
+        A high-risk keyword forces HIGH risk regardless of mood analysis, so
+        callers that only need the crisis result can skip the models for
+        these messages.
+        
+        Args:
+            text: User input text to analyze
+            keyword_matches: Optional precomputed `match_crisis_keywords` result
+                for `text`, so callers that go on to full detection scan once
+            
+        Returns:
+            HIGH-risk crisis result (same shape as `detect_crisis_indicators_async`),
+            or None if no high-risk keyword matched and full detection is needed
+        """
+        if keyword_matches is None:
+            keyword_matches = match_crisis_keywords(text.lower())
+        high_keyword, _ = keyword_matches
+        if not high_keyword:
+            return None
+        
+        logger.warning("CRISIS DETECTED: Keyword '%s' found. Risk level: HIGH", high_keyword)
+        return {
+            "risk_level": "HIGH",
+            "indicators": [f"CRITICAL: Contains high-risk keyword: '{high_keyword}'"],
+            "requires_immediate_attention": True,
+            "detected_emotion_type": None,
+            "resources": self._get_crisis_resources("HIGH"),
+            "ai_enhanced": False
+        }
+    
+    async def detect_crisis_indicators_async(
+        self,
+        text: str,
+        mood_analysis: Dict[str, Any],
+        keyword_matches: Optional[Tuple[Optional[str], Optional[str]]] = None
+    ) -> Dict[str, Any]:
         """
         Detect potential crisis indicators with safety-first approach.
         
@@ -322,9 +840,14 @@ Emotions to consider: joy, sadness, anger, fear, surprise, disgust, neutral"""
         2. MEDIUM RISK: Distress indicators (hopeless, desperate, etc.)
         3. LOW RISK: Based on mood analysis (very low scores, extreme emotions)
         
+        The local assessment is cheap and runs inline; the TELUS AI reasoning
+        call is awaited instead of holding an inference pool thread for the
+        whole network round-trip.
+        
         Args:
             text: User input text to analyze
             mood_analysis: Previous mood analysis results containing sentiment and emotions
+            keyword_matches: Optional precomputed `match_crisis_keywords` result for `text`
             
         Returns:
             Dict containing:
@@ -334,45 +857,55 @@ Emotions to consider: joy, sadness, anger, fear, surprise, disgust, neutral"""
                 - resources: Appropriate crisis resources based on risk level
                 - ai_reasoning: (Optional) AI-generated reasoning from TELUS AI Factory
         """
-        # High-risk keywords that ALWAYS trigger HIGH risk level (safety-first)
-        high_risk_keywords = [
-            "suicide", "kill myself", "end it all", "ending it all", "not worth living",
-            "want to die", "hurt myself", "self harm", "end my life",
-            "take my life", "kill myself", "no reason to live", "thinking about ending",
-            "thinking of ending", "considering ending", "planning to end",
-            "thinking about ending it all", "thinking of ending it all",
-            "been thinking about ending", "been thinking of ending"
-        ]
+        risk_level, indicators, detected_emotion_type = self._assess_crisis(text, mood_analysis, keyword_matches)
         
-        # Medium-risk keywords that indicate distress
-        medium_risk_keywords = [
-            "hopeless", "no way out", "give up", "nothing matters",
-            "can't go on", "can't take it", "overwhelmed", "desperate"
-        ]
+        ai_enhancement = None
+        telus_service = get_telus_ai_service()
+        if telus_service:
+            try:
+                ai_enhancement = await telus_service.analyze_crisis_reasoning_async(
+                    text=text,
+                    mood_analysis=mood_analysis,
+                    keyword_risk_level=risk_level
+                )
+            except Exception as e:
+                logger.warning("TELUS AI enhancement unavailable: %s", e)
+        
+        return self._crisis_result(risk_level, indicators, detected_emotion_type, ai_enhancement)
+    
+    def _assess_crisis(
+        self,
+        text: str,
+        mood_analysis: Dict[str, Any],
+        keyword_matches: Optional[Tuple[Optional[str], Optional[str]]]
+    ) -> Tuple[str, List[str], Optional[str]]:
+        """
+        Keyword and mood-based part of crisis detection (no AI calls)
         
-        text_lower = text.lower()
+        Returns:
+            Tuple of (risk_level, indicators, detected_emotion_type)
+        """
         risk_level = "LOW"
         indicators = []
         detected_emotion_type = None
         
-        # SAFETY: Check high-risk keywords FIRST - these force HIGH risk
-        # Check longer phrases first to avoid partial matches (more specific = higher priority)
-        matched_keyword = None
-        for keyword in sorted(high_risk_keywords, key=len, reverse=True):
-            if keyword in text_lower:
-                risk_level = "HIGH"
-                matched_keyword = keyword
-                indicators.append(f"CRITICAL: Contains high-risk keyword: '{keyword}'")
-                logger.warning(f"CRISIS DETECTED: Keyword '{keyword}' found. Risk level: HIGH")
-                break  # One high-risk keyword is enough
-        
-        # If no high-risk keywords, check medium-risk
-        if risk_level != "HIGH":
-            for keyword in medium_risk_keywords:
-                if keyword in text_lower:
-                    risk_level = "MEDIUM"
-                    indicators.append(f"Contains distress indicator: '{keyword}'")
-                    break
+        # SAFETY: High-risk keywords force HIGH risk; the most specific
+        # (longest) matching phrase is reported
+        if keyword_matches is None:
+            keyword_matches = match_crisis_keywords(text.lower())
+        high_keyword, medium_keyword = keyword_matches
+        if high_keyword:
+            risk_level = "HIGH"
+            indicators.append(f"CRITICAL: Contains high-risk keyword: '{high_keyword}'")
+            logger.warning("CRISIS DETECTED: Keyword '%s' found. Risk level: HIGH", high_keyword)
+        elif medium_keyword:
+            # No high-risk keywords, but distress indicators present
+            risk_level = "MEDIUM"
+            indicators.append(f"Contains distress indicator: '{medium_keyword}'")
+        
+        # Lazy %-formatting: the message is only built if DEBUG is enabled
+        # (user text itself is never logged)
+        logger.debug("Crisis keyword scan: high=%s medium=%s", high_keyword, medium_keyword)
         
         # Additional checks only if no keywords detected
         if risk_level == "LOW":
@@ -399,39 +932,37 @@ Emotions to consider: joy, sadness, anger, fear, surprise, disgust, neutral"""
                 indicators.append("High intensity anxiety/fear detected")
                 detected_emotion_type = "anxiety"
         
-        # Enhance with TELUS AI Factory (deepseekv32) for advanced reasoning
-        ai_enhancement = None
-        telus_service = get_telus_ai_service()
-        if telus_service:
-            try:
-                ai_enhancement = telus_service.analyze_crisis_reasoning(
-                    text=text,
-                    mood_analysis=mood_analysis,
-                    keyword_risk_level=risk_level
-                )
-                # Use AI reasoning if available, but prioritize safety (HIGH risk from keywords)
-                if ai_enhancement and ai_enhancement.get("ai_enhanced"):
-                    # Safety: If keyword detection says HIGH, always keep it HIGH
-                    if risk_level == "HIGH":
-                        final_risk_level = "HIGH"
-                    else:
-                        final_risk_level = ai_enhancement.get("risk_level", risk_level)
-                    
-                    # Merge indicators
-                    ai_indicators = ai_enhancement.get("indicators", [])
-                    all_indicators = indicators + ai_indicators
-                    
-                    return {
-                        "risk_level": final_risk_level,
-                        "indicators": all_indicators,
-                        "requires_immediate_attention": final_risk_level == "HIGH",
-                        "detected_emotion_type": detected_emotion_type,
-                        "resources": self._get_crisis_resources(final_risk_level, detected_emotion_type),
-                        "ai_reasoning": ai_enhancement.get("reasoning", ""),
-                        "ai_enhanced": True
-                    }
-            except Exception as e:
-                logger.warning(f"TELUS AI enhancement unavailable: {e}")
+        return risk_level, indicators, detected_emotion_type
+    
+    def _crisis_result(
+        self,
+        risk_level: str,
+        indicators: List[str],
+        detected_emotion_type: Optional[str],
+        ai_enhancement: Optional[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """Combine the local assessment with optional AI reasoning into the crisis result"""
+        # Use AI reasoning if available, but prioritize safety (HIGH risk from keywords)
+        if ai_enhancement and ai_enhancement.get("ai_enhanced"):
+            # Safety: If keyword detection says HIGH, always keep it HIGH
+            if risk_level == "HIGH":
+                final_risk_level = "HIGH"
+            else:
+                final_risk_level = ai_enhancement.get("risk_level", risk_level)
+            
+            # Merge indicators
+            ai_indicators = ai_enhancement.get("indicators", [])
+            all_indicators = indicators + ai_indicators
+            
+            return {
+                "risk_level": final_risk_level,
+                "indicators": all_indicators,
+                "requires_immediate_attention": final_risk_level == "HIGH",
+                "detected_emotion_type": detected_emotion_type,
+                "resources": self._get_crisis_resources(final_risk_level, detected_emotion_type),
+                "ai_reasoning": ai_enhancement.get("reasoning", ""),
+                "ai_enhanced": True
+            }
         
         # Return crisis analysis results
         return {
@@ -450,72 +981,23 @@ Emotions to consider: joy, sadness, anger, fear, surprise, disgust, neutral"""
         Resources are prioritized based on:
         1. Risk level (HIGH gets emergency services first)
         2. Emotion type (anxiety vs depression get specialized resources)
-        """
-        resources = []
-        
-        # HIGH RISK: Always include emergency services first
-        if risk_level == "HIGH":
-            resources.append({
-                "name": "Emergency Services",
-                "phone": "911",
-                "text": "Call immediately if in immediate danger",
-                "available": "24/7",
-                "priority": "IMMEDIATE",
-                "description": "Call 911 immediately if you or someone else is in immediate danger"
-            })
-        
-        # Emotion-specific resources
-        if emotion_type == "anxiety":
-            resources.append({
-                "name": "Anxiety Canada",
-                "phone": "1-604-620-0744",
-                "website": "https://www.anxietycanada.com/",
-                "available": "24/7",
-                "description": "Specialized support for anxiety and panic disorders"
-            })
-        elif emotion_type == "depression":
-            resources.append({
-                "name": "Crisis Services Canada",
-                "phone": "1-833-456-4566",
-                "text": "45645",
-                "website": "https://www.crisisservicescanada.ca/",
-                "available": "24/7",
-                "description": "Free, confidential support for depression and mental health crises"
-            })
-        
-        # General crisis resources
-        resources.extend([
-            {
-                "name": "Crisis Services Canada",
-                "phone": "1-833-456-4566",
-                "text": "45645",
-                "website": "https://www.crisisservicescanada.ca/",
-                "available": "24/7",
-                "description": "Free, confidential support for anyone in Canada"
-            },
-            {
-                "name": "Kids Help Phone",
-                "phone": "1-800-668-6868",
-                "text": "686868",
-                "website": "https://kidshelpphone.ca/",
-                "available": "24/7",
-                "description": "Support for youth under 20"
-            }
-        ])
-        
-        # Remove duplicates (in case emotion-specific resource matches general)
-        seen = set()
-        unique_resources = []
-        for resource in resources:
-            key = resource["name"]
-            if key not in seen:
-                seen.add(key)
-                unique_resources.append(resource)
         
-        return unique_resources
+        Lists are precomputed in CRISIS_RESOURCE_TABLE; the resource dicts
+        are shared, so callers must not mutate them.
+        """
+        key = (risk_level == "HIGH", emotion_type if emotion_type in EMOTION_CRISIS_RESOURCES else None)
+        return list(CRISIS_RESOURCE_TABLE[key])
+
 
-# Global AI service instance
-ai_service = AIService()
+@lru_cache(maxsize=1)
+def get_ai_service() -> AIService:
+    """
+    Shared AIService instance, created on first use
+    
+    Importing this module stays cheap; the service (and, lazily, its
+    models) is only built once a request actually needs it.
+    """
+    return AIService()
 
 
 
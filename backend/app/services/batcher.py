@@ -0,0 +1,132 @@
+"""
+Inference Batcher for concurrent mood analysis requests
+
+Requests arriving within a short window are coalesced into a single batch
+and analyzed with one pass through the local models, instead of each
+request running its own forward pass while blocking the event loop.
+"""
+
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+from app.services.ai_service import get_ai_service
+from app.services.executor import run_in_pool
+
+logger = logging.getLogger(__name__)
+
+# Batching limits: flush when the batch is full or the window has elapsed
+MAX_BATCH = 32
+MAX_WAIT = 0.01  # seconds
+
+
+class InferenceBatcher:
+    """
+    Micro-batcher in front of `AIService.analyze_mood_batch`.
+
+    A single background task drains the queue, so the models only ever see
+    one batch at a time. Inference runs in a thread pool to keep the event
+    loop free for other requests.
+    """
+
+    def __init__(self, max_batch: int = MAX_BATCH, max_wait: float = MAX_WAIT):
+        """Initialize batcher (the worker task is started on app startup)"""
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Start the background batching task on the running event loop"""
+        if self._worker is None:
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+            logger.info("Inference batcher started (max_batch=%s, max_wait=%ss)", self.max_batch, self.max_wait)
+
+    async def stop(self):
+        """Stop the background task and fail any requests still waiting"""
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        while not self._queue.empty():
+            _, future = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("Inference batcher stopped"))
+        self._worker = None
+        self._queue = None
+
+    async def infer(self, text: str) -> Dict[str, Any]:
+        """
+        Analyze mood for a single text
+
+        Args:
+            text: Input text to analyze
+
+        Returns:
+            Mood analysis, same shape as `AIService.analyze_mood`
+        """
+        loop = asyncio.get_running_loop()
+
+        # Remote (Gemini) analysis gains nothing from batching - run it directly
+        ai_service = get_ai_service()
+        if not ai_service.use_local_models:
+            return await run_in_pool(ai_service.analyze_mood, text)
+
+        if self._worker is None:
+            self.start()
+
+        future = loop.create_future()
+        await self._queue.put((text, future))
+        return await future
+
+    async def _collect_batch(self) -> List[Tuple[str, asyncio.Future]]:
+        """Wait for one request, then gather more until the batch is full or the window closes"""
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+
+        while len(batch) < self.max_batch:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _run(self):
+        """Background loop: collect a batch, run it, resolve each request's future"""
+        while True:
+            batch = await self._collect_batch()
+            # Skip requests whose client already went away
+            batch = [(text, future) for text, future in batch if not future.done()]
+            if not batch:
+                continue
+
+            texts = [text for text, _ in batch]
+            try:
+                results = await run_in_pool(get_ai_service().analyze_mood_batch, texts)
+            except Exception as e:
+                logger.error("Batched inference failed for %d requests: %s", len(texts), e)
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+
+# Global batcher instance
+inference_batcher = InferenceBatcher()
+
+
+async def infer(text: str) -> Dict[str, Any]:
+    """Analyze mood for `text` through the shared inference batcher"""
+    return await inference_batcher.infer(text)
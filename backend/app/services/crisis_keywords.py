@@ -0,0 +1,117 @@
+"""
+Crisis Keyword Screening
+
+Keyword lists and the single-pass matcher used by crisis detection. Kept
+free of model imports so anything that only needs the keyword screen
+(routes, scripts) can use it without loading transformers.
+"""
+
+from typing import Optional, Tuple
+import re
+
+# Aho-Corasick keyword matching is optional (falls back to substring scans)
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+# High-risk keywords that ALWAYS trigger HIGH risk level (safety-first)
+HIGH_RISK_KEYWORDS = (
+    "suicide", "kill myself", "end it all", "ending it all", "not worth living",
+    "want to die", "hurt myself", "self harm", "end my life",
+    "take my life", "kill myself", "no reason to live", "thinking about ending",
+    "thinking of ending", "considering ending", "planning to end",
+    "thinking about ending it all", "thinking of ending it all",
+    "been thinking about ending", "been thinking of ending"
+)
+
+# Medium-risk keywords that indicate distress
+MEDIUM_RISK_KEYWORDS = (
+    "hopeless", "no way out", "give up", "nothing matters",
+    "can't go on", "can't take it", "overwhelmed", "desperate"
+)
+
+# Longer phrases first, so the most specific high-risk match wins
+# (duplicates dropped; ties keep list order)
+_HIGH_RISK_BY_LENGTH = tuple(sorted(dict.fromkeys(HIGH_RISK_KEYWORDS), key=len, reverse=True))
+
+
+def _trie_pattern(keywords) -> str:
+    """
+    Regex alternation of keywords factored into a prefix trie
+    
+    "thinking about ending" and "thinking of ending" become
+    "thinking (?:about|of) ending", so the shared prefixes are compared once
+    per position instead of once per keyword.
+    """
+    trie = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[""] = {}  # end of a keyword
+    
+    def emit(node):
+        branches = [re.escape(char) + emit(child) for char, child in node.items() if char]
+        if not branches:
+            return ""
+        pattern = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        # A keyword ending here makes the rest optional (the gate only needs a hit)
+        return "(?:" + pattern + ")?" if "" in node else pattern
+    
+    return emit(trie)
+
+
+# Without pyahocorasick, one compiled trie-shaped alternation per tier tells
+# in a single C-level pass whether any keyword of that tier occurs at all
+# (the common case for ordinary messages is no match); only on a hit does
+# the ordered scan run to pick the reported keyword
+_HIGH_RISK_RE = re.compile(_trie_pattern(_HIGH_RISK_BY_LENGTH))
+_MEDIUM_RISK_RE = re.compile(_trie_pattern(MEDIUM_RISK_KEYWORDS))
+
+
+def _build_keyword_automaton():
+    """Compile all crisis keywords into one Aho-Corasick automaton (None if unavailable)"""
+    if not AHOCORASICK_AVAILABLE:
+        return None
+    automaton = ahocorasick.Automaton()
+    for keyword in MEDIUM_RISK_KEYWORDS:
+        automaton.add_word(keyword, ("MEDIUM", MEDIUM_RISK_KEYWORDS.index(keyword), keyword))
+    for keyword in HIGH_RISK_KEYWORDS:
+        automaton.add_word(keyword, ("HIGH", _HIGH_RISK_BY_LENGTH.index(keyword), keyword))
+    automaton.make_automaton()
+    return automaton
+
+
+_KEYWORD_AUTOMATON = _build_keyword_automaton()
+
+
+def match_crisis_keywords(text_lower: str) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Find crisis keywords in lowercased text
+    
+    Returns:
+        Tuple of (most specific high-risk keyword, first medium-risk keyword
+        in list order); either is None if absent. The medium-risk keyword is
+        only looked up when no high-risk keyword matched.
+    """
+    if _KEYWORD_AUTOMATON is not None:
+        # Single pass over the text; rank matches by keyword priority
+        best = {}
+        for _, (tier, rank, keyword) in _KEYWORD_AUTOMATON.iter(text_lower):
+            if tier not in best or rank < best[tier][0]:
+                best[tier] = (rank, keyword)
+        if "HIGH" in best:
+            return best["HIGH"][1], None
+        return None, best["MEDIUM"][1] if "MEDIUM" in best else None
+    
+    if _HIGH_RISK_RE.search(text_lower):
+        for keyword in _HIGH_RISK_BY_LENGTH:
+            if keyword in text_lower:
+                return keyword, None
+    if _MEDIUM_RISK_RE.search(text_lower):
+        for keyword in MEDIUM_RISK_KEYWORDS:
+            if keyword in text_lower:
+                return None, keyword
+    return None, None
@@ -0,0 +1,28 @@
+"""
+Shared thread pool for blocking mood analysis
+
+Local model inference (and the sync Gemini sentiment/emotion calls that
+replace it when USE_LOCAL_MODELS=false) is synchronous. Route handlers are
+`async def`, so calling it directly would stall the event loop and queue
+every other request (including /health) behind one call. Generation calls
+use the async AI clients and don't need the pool.
+"""
+
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+# Dedicated pool for mood analysis (kept separate from the
+# default executor so bursts of AI work can't starve other thread users).
+# Its size also bounds how many forward passes - and their activation
+# memory - can be in flight at once.
+INFERENCE_WORKERS = max(1, int(os.getenv("INFERENCE_WORKERS", "4")))
+INFER_POOL = ThreadPoolExecutor(max_workers=INFERENCE_WORKERS, thread_name_prefix="inference")
+
+
+async def run_in_pool(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Run a blocking function on the inference pool and await its result"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(INFER_POOL, functools.partial(func, *args, **kwargs))
@@ -2,9 +2,173 @@
 Mood Service for tracking and analyzing mood patterns over time
 """
 
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
+from collections import defaultdict
 from datetime import datetime, timedelta
-import json
+from functools import lru_cache
+import hashlib
+import heapq
+import os
+import threading
+import time
+import zlib
+import numpy as np
+
+# Fixed emotion columns for the columnar history store. Covers the labels
+# produced by the local emotion model, the Gemini fallback and demo data;
+# other labels are not stored. Emotions absent from an entry are NaN.
+EMOTION_COLS = ("joy", "sadness", "anxiety", "fear", "anger", "disgust", "surprise", "neutral", "optimism")
+EMOTION_INDEX = {emotion: i for i, emotion in enumerate(EMOTION_COLS)}
+
+# Cached history/pattern results are also keyed on the current minute, so
+# entries ageing out of the time window are picked up without a new write
+CACHE_WINDOW_SECONDS = 60
+
+# Timestamps are stored as naive UTC datetime64 values
+TIMESTAMP_DTYPE = "datetime64[us]"
+
+# Initial per-user row capacity; buffers double when full
+MIN_CAPACITY = 16
+
+# Entries kept per user; the oldest are dropped beyond this
+MAX_ENTRIES_PER_USER = max(1, int(os.getenv("MOOD_HISTORY_MAX_ENTRIES", "10000")))
+
+# Time-of-day buckets are 6-hour blocks of the UTC hour (hour // 6):
+# night (0-6), morning (6-12), afternoon (12-18), evening (18-24)
+DAYPART_HOURS = 6
+
+# History lives in process memory, so with several backend processes each
+# user must always reach the same one. A front proxy routes on shard_for()
+# and sends X-User-Shard, and routes/sharding.py verifies both on each
+# worker; SHARD_COUNT=1 (default) disables the check.
+SHARD_COUNT = max(1, int(os.getenv("SHARD_COUNT", "1")))
+WORKER_SHARD = int(os.getenv("WORKER_SHARD", "0"))
+
+
+def shard_for(user_id: str) -> int:
+    """Stable shard index for a user (crc32, identical across processes)"""
+    return zlib.crc32(user_id.encode("utf-8")) % SHARD_COUNT
+
+
+def text_digest(text: str) -> str:
+    """Short BLAKE2b digest of an entry's text (identifies repeats without keeping the text)"""
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def emotions_to_row(emotions: Dict[str, float]) -> np.ndarray:
+    """Convert an emotion dict to a row aligned with EMOTION_COLS"""
+    row = np.full(len(EMOTION_COLS), np.nan, dtype=np.float32)
+    for emotion, score in emotions.items():
+        col = EMOTION_INDEX.get(emotion)
+        if col is not None:
+            row[col] = score
+    return row
+
+
+def row_to_emotions(row: np.ndarray) -> Dict[str, float]:
+    """Convert an EMOTION_COLS-aligned row back to an emotion dict"""
+    # Round to the precision float32 actually holds, so values serialize cleanly
+    return {
+        emotion: round(score, 6)
+        for emotion, score in zip(EMOTION_COLS, row.tolist())
+        if score == score  # skip NaN (absent)
+    }
+
+
+class UserMoodArrays:
+    """
+    One user's mood entries, stored column-wise
+    
+    Numeric columns live in preallocated arrays whose capacity doubles when
+    full, so appends are amortized O(1) instead of copying the whole history.
+    Only the newest `max_entries` rows (from `start` to `size`) are live;
+    older rows are dropped the next time the buffers are reallocated, which
+    copies only the live rows into fresh arrays and lists. Rows are never
+    modified once written, so views returned by `columns()` stay valid while
+    later entries are appended.
+    
+    Entries normally arrive in time order; `chronological` records whether
+    that still holds, so time windows can be found by binary search.
+    """
+    
+    def __init__(self, max_entries: int = MAX_ENTRIES_PER_USER):
+        """Initialize empty columns"""
+        self.max_entries = max_entries
+        self.start = 0
+        self.size = 0
+        self.chronological = True
+        self._timestamps = np.zeros(0, dtype=TIMESTAMP_DTYPE)
+        self._mood_scores = np.zeros(0, dtype=np.float64)
+        self._emotions = np.zeros((0, len(EMOTION_COLS)), dtype=np.float32)
+        self._text_lengths = np.zeros(0, dtype=np.int32)
+        self.sentiments: List[Dict[str, Any]] = []
+        self.text_hashes: List[str] = []
+    
+    def _reallocate(self, needed: int):
+        """
+        Move the rows still live after growing to `needed` rows into new
+        buffers with room to double
+        """
+        first = max(self.start, needed - self.max_entries)
+        kept = self.size - first
+        capacity = max(2 * (needed - first), MIN_CAPACITY)
+        for name in ("_timestamps", "_mood_scores", "_emotions", "_text_lengths"):
+            old = getattr(self, name)
+            new = np.empty((capacity, *old.shape[1:]), dtype=old.dtype)
+            new[:kept] = old[first:self.size]
+            setattr(self, name, new)
+        # New list objects, so snapshots holding the old lists are unaffected
+        self.sentiments = self.sentiments[first:self.size]
+        self.text_hashes = self.text_hashes[first:self.size]
+        self.start, self.size = 0, kept
+    
+    def append(
+        self,
+        timestamps: np.ndarray,
+        mood_scores: np.ndarray,
+        emotions: np.ndarray,
+        sentiments: List[Dict[str, Any]],
+        text_lengths: np.ndarray,
+        text_hashes: List[str]
+    ):
+        """Append a block of rows (caller holds the service lock)"""
+        if len(timestamps) > self.max_entries:
+            keep = slice(len(timestamps) - self.max_entries, None)
+            timestamps, mood_scores, emotions = timestamps[keep], mood_scores[keep], emotions[keep]
+            sentiments, text_lengths, text_hashes = sentiments[keep], text_lengths[keep], text_hashes[keep]
+        if self.size + len(timestamps) > self._mood_scores.size:
+            self._reallocate(self.size + len(timestamps))
+        
+        start, end = self.size, self.size + len(timestamps)
+        if self.chronological and end > start:
+            in_order = not (timestamps[1:] < timestamps[:-1]).any()
+            after_last = start == 0 or timestamps[0] >= self._timestamps[start - 1]
+            self.chronological = bool(in_order and after_last)
+        self._timestamps[start:end] = timestamps
+        self._mood_scores[start:end] = mood_scores
+        self._emotions[start:end] = emotions
+        self._text_lengths[start:end] = text_lengths
+        self.sentiments.extend(sentiments)
+        self.text_hashes.extend(text_hashes)
+        self.size = end
+        self.start = max(self.start, end - self.max_entries)
+    
+    def columns(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, List[Dict[str, Any]], List[str], int]:
+        """
+        Live columns: views of rows `start` to `size`, plus the shared lists
+        and `start`, the list index of the first live row (list entries
+        past `size` belong to later appends)
+        
+        Returns:
+            Tuple of (timestamps, mood_scores, emotions, text_lengths,
+            sentiments, text_hashes, start)
+        """
+        first, n = self.start, self.size
+        return (
+            self._timestamps[first:n], self._mood_scores[first:n], self._emotions[first:n],
+            self._text_lengths[first:n], self.sentiments, self.text_hashes, first
+        )
+
 
 class MoodService:
     """Service for mood tracking and pattern analysis"""
@@ -12,33 +176,137 @@ class MoodService:
     def __init__(self):
         """Initialize mood service"""
         # In-memory storage for demo (replace with database in production)
-        self.mood_history: Dict[str, List[Dict[str, Any]]] = {}
+        # Stored column-wise per user: one array/list per field, one row per entry
+        self.users: Dict[str, UserMoodArrays] = {}
+        self._lock = threading.Lock()
+        
+        # Per-user write counter: cached results are keyed on it, so any write
+        # invalidates them. Cached results are shared - treat them as read-only.
+        self._versions: Dict[str, int] = defaultdict(int)
+        self._history_cache = lru_cache(maxsize=256)(self._build_history)
+        self._patterns_cache = lru_cache(maxsize=256)(self._build_patterns)
     
     def save_mood_entry(self, user_id: str, mood_data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Save a mood entry for a user
         
+        Only the length and a digest of the entry's text are kept; the text
+        itself is not stored.
+        
         Args:
             user_id: User identifier
             mood_data: Mood analysis data
             
         Returns:
-            Saved mood entry with timestamp
-        """
-        entry = {
-            "timestamp": datetime.utcnow().isoformat(),
-            "mood_score": mood_data.get("mood_score", 5.0),
-            "sentiment": mood_data.get("sentiment", {}),
-            "emotions": mood_data.get("emotions", {}),
-            "text": mood_data.get("text", "")
+            Saved mood entry with timestamp, text length and text digest
+        """
+        timestamp = datetime.utcnow()
+        mood_score = mood_data.get("mood_score", 5.0)
+        sentiment = mood_data.get("sentiment", {})
+        emotions = mood_data.get("emotions", {})
+        text = mood_data.get("text", "")
+        
+        self.append_entries(
+            user_id,
+            timestamps=np.array([timestamp], dtype=TIMESTAMP_DTYPE),
+            mood_scores=np.array([mood_score], dtype=np.float64),
+            emotions=emotions_to_row(emotions)[None, :],
+            sentiments=[sentiment],
+            texts=[text]
+        )
+        
+        return {
+            "timestamp": timestamp.isoformat(),
+            "mood_score": mood_score,
+            "sentiment": sentiment,
+            "emotions": emotions,
+            "text_length": len(text),
+            "text_hash": text_digest(text)
         }
+    
+    def append_entries(
+        self,
+        user_id: str,
+        timestamps: np.ndarray,
+        mood_scores: np.ndarray,
+        emotions: np.ndarray,
+        sentiments: List[Dict[str, Any]],
+        texts: List[str]
+    ):
+        """
+        Append a block of mood entries for a user
+        
+        Args:
+            user_id: User identifier
+            timestamps: Entry timestamps (UTC), datetime64 array or list of datetimes
+            mood_scores: Mood scores, one per entry
+            emotions: Emotion matrix with one EMOTION_COLS-aligned row per entry
+            sentiments: Sentiment dicts, one per entry
+            texts: Entry texts, one per entry (reduced to length and digest, not stored)
+        """
+        timestamps = np.asarray(timestamps, dtype=TIMESTAMP_DTYPE)
+        text_lengths = np.fromiter((len(text) for text in texts), dtype=np.int32, count=len(texts))
+        text_hashes = [text_digest(text) for text in texts]
+        with self._lock:
+            user = self.users.get(user_id)
+            if user is None:
+                user = self.users[user_id] = UserMoodArrays()
+            user.append(timestamps, mood_scores, emotions, sentiments, text_lengths, text_hashes)
+            self._versions[user_id] += 1
+    
+    def clear_history(self, user_id: str):
+        """Remove all mood entries for a user"""
+        with self._lock:
+            self.users.pop(user_id, None)
+            self._versions[user_id] += 1
+    
+    def _cache_key(self, user_id: str) -> Tuple[int, int]:
+        """Current (version, time bucket) for a user's cached results"""
+        return self._versions.get(user_id, 0), int(time.time() // CACHE_WINDOW_SECONDS)
+    
+    def _window(self, user_id: str, days: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, List[Dict[str, Any]], List[str]]:
+        """
+        Snapshot a user's entries from the last `days` days, in chronological order
+        
+        Returns:
+            Tuple of (timestamps, mood_scores, emotions, text_lengths, sentiments, text_hashes)
+        """
+        with self._lock:
+            user = self.users.get(user_id)
+            if user is None:
+                return (
+                    np.zeros(0, dtype=TIMESTAMP_DTYPE), np.zeros(0), np.zeros((0, len(EMOTION_COLS)), dtype=np.float32),
+                    np.zeros(0, dtype=np.int32), [], []
+                )
+            timestamps, mood_scores, emotions, text_lengths, sentiments, text_hashes, offset = user.columns()
+            chronological = user.chronological
         
-        if user_id not in self.mood_history:
-            self.mood_history[user_id] = []
+        cutoff_date = np.datetime64(datetime.utcnow() - timedelta(days=days), "us")
         
-        self.mood_history[user_id].append(entry)
+        if chronological:
+            # Entries are in time order: the window is a suffix, found in O(log n)
+            start = int(np.searchsorted(timestamps, cutoff_date, side="left"))
+            return (
+                timestamps[start:],
+                mood_scores[start:],
+                emotions[start:],
+                text_lengths[start:],
+                sentiments[offset + start:offset + timestamps.size],
+                text_hashes[offset + start:offset + timestamps.size]
+            )
         
-        return entry
+        # Out-of-order history (e.g. backfilled entries): filter and sort
+        idx = np.flatnonzero(timestamps >= cutoff_date)
+        idx = idx[np.argsort(timestamps[idx], kind="stable")]
+        order = (idx + offset).tolist()
+        return (
+            timestamps[idx],
+            mood_scores[idx],
+            emotions[idx],
+            text_lengths[idx],
+            [sentiments[i] for i in order],
+            [text_hashes[i] for i in order]
+        )
     
     def get_mood_history(self, user_id: str, days: int = 30) -> List[Dict[str, Any]]:
         """
@@ -51,18 +319,26 @@ class MoodService:
         Returns:
             List of mood entries
         """
-        if user_id not in self.mood_history:
-            return []
-        
-        cutoff_date = datetime.utcnow() - timedelta(days=days)
-        
-        history = []
-        for entry in self.mood_history[user_id]:
-            entry_date = datetime.fromisoformat(entry["timestamp"])
-            if entry_date >= cutoff_date:
-                history.append(entry)
+        return self._history_cache(user_id, days, *self._cache_key(user_id))
+    
+    def _build_history(self, user_id: str, days: int, version: int, time_bucket: int) -> List[Dict[str, Any]]:
+        """Uncached `get_mood_history` (version/time_bucket only key the cache)"""
+        timestamps, mood_scores, emotions, text_lengths, sentiments, text_hashes = self._window(user_id, days)
         
-        return sorted(history, key=lambda x: x["timestamp"])
+        # Dict-shaped entries are only materialized here, at the API boundary.
+        # Timestamps become datetime objects; the JSON encoder formats them.
+        return [
+            {
+                "timestamp": timestamp,
+                "mood_score": mood_score,
+                "sentiment": sentiment,
+                "emotions": row_to_emotions(row),
+                "text_length": text_length,
+                "text_hash": text_hash
+            }
+            for timestamp, mood_score, row, sentiment, text_length, text_hash
+            in zip(timestamps.tolist(), mood_scores.tolist(), emotions, sentiments, text_lengths.tolist(), text_hashes)
+        ]
     
     def analyze_patterns(self, user_id: str) -> Dict[str, Any]:
         """
@@ -74,9 +350,13 @@ class MoodService:
         Returns:
             Pattern analysis results
         """
-        history = self.get_mood_history(user_id, days=30)
+        return self._patterns_cache(user_id, *self._cache_key(user_id))
+    
+    def _build_patterns(self, user_id: str, version: int, time_bucket: int) -> Dict[str, Any]:
+        """Uncached `analyze_patterns` (version/time_bucket only key the cache)"""
+        timestamps, scores, emotions, _, _, _ = self._window(user_id, days=30)
         
-        if not history:
+        if not timestamps.size:
             return {
                 "patterns": [],
                 "trend": "INSUFFICIENT_DATA",
@@ -84,13 +364,15 @@ class MoodService:
             }
         
         # Calculate average mood
-        mood_scores = [entry["mood_score"] for entry in history]
-        average_mood = sum(mood_scores) / len(mood_scores)
+        n = scores.size
+        total = float(scores.sum())
+        average_mood = total / n
         
-        # Determine trend
-        if len(mood_scores) >= 7:
-            recent_avg = sum(mood_scores[-7:]) / 7
-            older_avg = sum(mood_scores[:-7]) / len(mood_scores[:-7]) if len(mood_scores) > 7 else recent_avg
+        # Determine trend (the older sum is the total minus the last 7, no second pass)
+        if n >= 7:
+            recent_sum = float(scores[-7:].sum())
+            recent_avg = recent_sum / 7
+            older_avg = (total - recent_sum) / (n - 7) if n > 7 else recent_avg
             
             if recent_avg > older_avg + 0.5:
                 trend = "IMPROVING"
@@ -101,46 +383,48 @@ class MoodService:
         else:
             trend = "INSUFFICIENT_DATA"
         
-        # Identify common emotions
-        all_emotions = {}
-        for entry in history:
-            emotions = entry.get("emotions", {})
-            for emotion, score in emotions.items():
-                if emotion not in all_emotions:
-                    all_emotions[emotion] = []
-                all_emotions[emotion].append(score)
-        
+        # Identify common emotions (present in at least 3 entries), one column per emotion
+        present = ~np.isnan(emotions)
+        counts = present.sum(axis=0)
+        sums = np.where(present, emotions, 0.0).sum(axis=0, dtype=np.float64)
         common_emotions = {
-            emotion: sum(scores) / len(scores)
-            for emotion, scores in all_emotions.items()
-            if len(scores) >= 3
+            emotion: float(sums[col] / counts[col])
+            for col, emotion in enumerate(EMOTION_COLS)
+            if counts[col] >= 3
         }
-        common_emotions = dict(sorted(common_emotions.items(), key=lambda x: x[1], reverse=True)[:5])
+        common_emotions = dict(heapq.nlargest(5, common_emotions.items(), key=lambda x: x[1]))
         
         patterns = []
         
-        # Pattern: Time of day
-        morning_moods = [e["mood_score"] for e in history if 6 <= datetime.fromisoformat(e["timestamp"]).hour < 12]
-        afternoon_moods = [e["mood_score"] for e in history if 12 <= datetime.fromisoformat(e["timestamp"]).hour < 18]
-        evening_moods = [e["mood_score"] for e in history if 18 <= datetime.fromisoformat(e["timestamp"]).hour < 24]
+        # Pattern: Time of day (per-bucket sums and counts in one pass each)
+        hours = (timestamps - timestamps.astype("datetime64[D]")) // np.timedelta64(1, "h")
+        dayparts = hours.astype(np.intp) // DAYPART_HOURS
+        daypart_counts = np.bincount(dayparts, minlength=4)
+        daypart_sums = np.bincount(dayparts, weights=scores, minlength=4)
         
-        if morning_moods and afternoon_moods and evening_moods:
+        if daypart_counts[1:].all():
+            morning, afternoon, evening = (daypart_sums[1:] / daypart_counts[1:]).tolist()
             patterns.append({
                 "type": "TIME_OF_DAY",
-                "description": f"Morning: {sum(morning_moods)/len(morning_moods):.1f}, "
-                              f"Afternoon: {sum(afternoon_moods)/len(afternoon_moods):.1f}, "
-                              f"Evening: {sum(evening_moods)/len(evening_moods):.1f}"
+                "description": f"Morning: {morning:.1f}, "
+                              f"Afternoon: {afternoon:.1f}, "
+                              f"Evening: {evening:.1f}",
+                "averages": {
+                    "Morning": round(morning, 2),
+                    "Afternoon": round(afternoon, 2),
+                    "Evening": round(evening, 2)
+                }
             })
         
         return {
             "patterns": patterns,
             "trend": trend,
             "average_mood": round(average_mood, 2),
-            "total_entries": len(history),
+            "total_entries": timestamps.size,
             "common_emotions": common_emotions,
             "mood_range": {
-                "min": min(mood_scores),
-                "max": max(mood_scores)
+                "min": float(scores.min()),
+                "max": float(scores.max())
             }
         }
     
@@ -154,45 +438,40 @@ class MoodService:
         Returns:
             Mood prediction results
         """
-        history = self.get_mood_history(user_id, days=30)
+        _, scores, _, _, _, _ = self._window(user_id, days=30)
         
-        if len(history) < 7:
+        if len(scores) < 7:
             return {
                 "prediction": "INSUFFICIENT_DATA",
                 "confidence": 0.0,
                 "next_week_forecast": []
             }
         
-        mood_scores = [entry["mood_score"] for entry in history[-14:]]  # Last 2 weeks
+        mood_scores = scores[-14:]  # Last 2 weeks
         
-        # Simple linear trend prediction
-        if len(mood_scores) >= 7:
-            recent_trend = (mood_scores[-1] - mood_scores[-7]) / 7
-            
-            # Predict next 7 days
-            forecast = []
-            current_mood = mood_scores[-1]
-            
-            for day in range(1, 8):
-                predicted_mood = current_mood + (recent_trend * day)
-                predicted_mood = max(0, min(10, predicted_mood))  # Clamp to 0-10
-                forecast.append({
-                    "day": day,
-                    "predicted_mood": round(predicted_mood, 2),
-                    "date": (datetime.utcnow() + timedelta(days=day)).isoformat()
-                })
-            
-            return {
-                "prediction": "IMPROVING" if recent_trend > 0.1 else "DECLINING" if recent_trend < -0.1 else "STABLE",
-                "confidence": min(0.8, abs(recent_trend) * 10),
-                "next_week_forecast": forecast,
-                "trend_slope": round(recent_trend, 3)
+        # Least-squares linear trend over the recent entries (a two-point
+        # slope is dominated by the noise in the endpoints)
+        x = np.arange(mood_scores.size, dtype=np.float64)
+        recent_trend, intercept = np.polyfit(x, mood_scores, 1).tolist()
+        
+        # Predict next 7 days along the fitted line, clamped to 0-10
+        days = np.arange(1, 8)
+        predicted = np.clip(intercept + recent_trend * (x[-1] + days), 0, 10)
+        now = datetime.utcnow()
+        forecast = [
+            {
+                "day": day,
+                "predicted_mood": round(predicted_mood, 2),
+                "date": (now + timedelta(days=day)).isoformat()
             }
+            for day, predicted_mood in zip(days.tolist(), predicted.tolist())
+        ]
         
         return {
-            "prediction": "INSUFFICIENT_DATA",
-            "confidence": 0.0,
-            "next_week_forecast": []
+            "prediction": "IMPROVING" if recent_trend > 0.1 else "DECLINING" if recent_trend < -0.1 else "STABLE",
+            "confidence": min(0.8, abs(recent_trend) * 10),
+            "next_week_forecast": forecast,
+            "trend_slope": round(recent_trend, 3)
         }
 
 # Global mood service instance
@@ -10,10 +10,17 @@ Models Available:
 - gpt-oss-120b: Advanced AI (most powerful)
 """
 
-from openai import OpenAI
-from typing import Dict, List, Any, Optional
+from openai import AsyncOpenAI
+from collections import OrderedDict
+from typing import Dict, List, Any, AsyncIterator, Optional, Tuple
+import asyncio
+import hashlib
+import heapq
 import logging
 import os
+import threading
+import time
+import httpx
 from dotenv import load_dotenv
 
 # Load environment variables early (before service initialization)
@@ -29,6 +36,200 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# Model names from TELUS documentation
+GEMMA_MODEL = "google/gemma-3-27b-it"
+DEEPSEEK_MODEL = "deepseek-ai/DeepSeek-V3"  # Model name for deepseekv32 endpoint
+
+# Connection pool for the TELUS endpoints. Idle connections are kept for
+# 5 minutes (httpx defaults to 5 s), so requests arriving a few seconds
+# apart reuse the TLS session instead of handshaking again.
+HTTP_POOL_LIMITS = httpx.Limits(max_connections=64, max_keepalive_connections=32, keepalive_expiry=300.0)
+HTTP_TIMEOUT = httpx.Timeout(10.0, connect=5.0)
+
+# Retries per TELUS call. The OpenAI client retries only transient failures
+# (connection errors, timeouts, 408/409/429 and 5xx) with jittered
+# exponential backoff from 0.5 s, honoring Retry-After.
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+
+# Generation budgets (TELUS max_tokens). Each reply is 2-3 sentences, or the
+# three-line crisis format, which all fit with margin; a smaller budget
+# means less decode time per call.
+RECOMMENDATION_MAX_TOKENS = 120
+INSIGHTS_MAX_TOKENS = 100
+CRISIS_REASONING_MAX_TOKENS = 150
+
+# Prompts are split into a static system part (role, guidelines, output
+# format) and a user part holding the request's data. TELUS AI gets them as
+# chat messages, so the byte-identical system prefix can be served from the
+# provider's prompt cache; Gemini gets both parts joined into one prompt.
+# User parts are filled with str.format by the _build_*_prompt methods.
+PROMPT_TOP_K = 5  # Most entries listed per emotions/patterns field
+MOOD_SCORE_STEP = 0.5  # Mood scores are snapped to this step in recommendation prompts
+Prompt = Tuple[str, str]  # (system, user)
+
+CRISIS_RECOMMENDATION_SYSTEM = """You are a compassionate mental health AI assistant. This is a CRISIS SITUATION requiring immediate support.
+
+⚠️ CRITICAL: The user is in crisis. Your recommendation MUST prioritize:
+1. Immediate professional support (crisis hotlines, mental health professionals)
+2. Connecting with trusted people (friends, family)
+3. Safety and immediate support resources
+
+DO NOT suggest wellness activities like breathing exercises, light exercise, or self-care as primary recommendations. Those are not appropriate for crisis situations.
+
+Provide a brief (2-3 sentences), empathetic recommendation focused on immediate support and professional help."""
+
+CRISIS_RECOMMENDATION_PROMPT = """User's Message: "{user_text}"
+
+Current Mood:
+- Mood Score: {mood_score:.1f}/10
+- Sentiment: {sentiment}
+- Top Emotions: {top_emotions}
+
+Recommendation:"""
+
+RECOMMENDATION_SYSTEM = """You are a compassionate mental health AI assistant. Based on the user data provided, give a personalized, empathetic recommendation that is SPECIFIC to their situation.
+
+IMPORTANT: Your recommendation should be SPECIFIC to what the user mentioned. For example:
+- If they mention exam anxiety → suggest study strategies, time management, test preparation tips
+- If they mention work stress → suggest work-life balance, task prioritization, boundary setting
+- If they mention relationship issues → suggest communication strategies, support resources
+- If they mention general anxiety → suggest grounding techniques, breathing exercises
+
+Provide a brief (2-3 sentences), supportive, and actionable recommendation that directly addresses their specific situation. Be empathetic and contextually relevant."""
+
+RECOMMENDATION_PROMPT = """{user_context}Current Mood:
+- Mood Score: {mood_score:.1f}/10
+- Sentiment: {sentiment}
+- Top Emotions: {top_emotions}
+
+Mood Patterns:
+- Trend: {trend}
+- Average Mood: {avg_mood:.1f}/10
+
+Recommendation:"""
+
+CRISIS_REASONING_SYSTEM = """You are a mental health crisis assessment AI. Analyze the situation provided and determine if immediate support is needed.
+
+Analyze the context, nuance, and severity. Consider:
+1. Is there immediate danger to self or others?
+2. Are there subtle indicators of distress?
+3. What is the emotional intensity?
+
+Provide:
+1. Risk Level (LOW, MEDIUM, HIGH, CRITICAL)
+2. Brief reasoning (1-2 sentences explaining why)
+3. Key indicators detected
+
+Format your response as:
+RISK_LEVEL: [level]
+REASONING: [explanation]
+INDICATORS: [list of key indicators]"""
+
+CRISIS_REASONING_PROMPT = """User Statement: "{text}"
+
+Mood Analysis:
+- Mood Score: {mood_score}/10
+- Sentiment: {sentiment}
+- Emotions: {emotions}
+
+Initial Risk Assessment: {keyword_risk_level}"""
+
+INSIGHTS_SYSTEM = """You are a mental health insights AI. Analyze the mood patterns provided and give a brief, empathetic insight (2-3 sentences).
+
+Provide a supportive, human-readable insight that helps the user understand their mood patterns. Be specific and actionable."""
+
+INSIGHTS_PROMPT = """Mood Patterns:
+- Trend: {trend}
+- Average Mood: {avg_mood:.1f}/10
+- Common Emotions: {common_emotions}
+- Time Patterns: {time_patterns}
+
+Insight:"""
+
+
+def _bucket(value: float, step: float = MOOD_SCORE_STEP) -> float:
+    """
+    Snap a score to the nearest multiple of `step` for prompt text
+    
+    A score of 5.24 and one of 5.31 describe the same mood to the model, but
+    as raw values they produce different prompts and never share a cached
+    generation. Only prompt text is quantized; stored analyses keep full values.
+    """
+    return round(value / step) * step
+
+
+# Generated text is cached per exact prompt; a repeated prompt skips the
+# network round-trip entirely (GENERATION_CACHE_SIZE=0 disables it)
+GENERATION_CACHE_SIZE = int(os.getenv("GENERATION_CACHE_SIZE", "1024"))
+GENERATION_CACHE_TTL = float(os.getenv("GENERATION_CACHE_TTL", "3600"))  # seconds
+
+
+class GenerationCache:
+    """
+    Thread-safe LRU cache of generated text with a TTL
+    
+    Keyed by a BLAKE2b digest of the model and generation settings plus the
+    exact prompt. Prompts can contain user messages, so only digests are
+    kept as keys. Matching is exact: a near-identical prompt is a miss.
+    """
+    
+    def __init__(self, maxsize: int = GENERATION_CACHE_SIZE, ttl: float = GENERATION_CACHE_TTL):
+        """Initialize an empty cache"""
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[bytes, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    @staticmethod
+    def key(prompt: Prompt, model: str, max_tokens: int, temperature: float) -> bytes:
+        """Digest identifying one generation request"""
+        system, user = prompt
+        digest = hashlib.blake2b(f"{model}\x00{max_tokens}\x00{temperature}\x00".encode("utf-8"), digest_size=16)
+        digest.update(system.encode("utf-8"))
+        digest.update(b"\x00")
+        digest.update(user.encode("utf-8"))
+        return digest.digest()
+    
+    def get(self, key: bytes) -> Optional[str]:
+        """Return the cached text for `key`, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+    
+    def put(self, key: bytes, text: str):
+        """Cache generated text"""
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, text)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+    
+    def clear(self):
+        """Drop all cached text"""
+        with self._lock:
+            self._entries.clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Cache size and hit/miss counters (for /health/caches)"""
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
 
 class TELUSAIService:
     """
@@ -51,11 +252,6 @@ class TELUSAIService:
             "dc8704d41888afb2b889a8ebac81d12f"
         )
         
-        self.gemma_client = OpenAI(
-            base_url=gemma_base_url,
-            api_key=gemma_api_key
-        )
-        
         # DeepSeekV32 client (Reasoning and complex logic)
         deepseek_base_url = os.getenv(
             "TELUS_AI_DEEPSEEK_BASE_URL",
@@ -66,11 +262,24 @@ class TELUSAIService:
             "a12a7d3705b12aeb46eb4cc8d77f5446"
         )
         
-        self.deepseek_client = OpenAI(
+        # Gemma-3-27b and DeepSeekV32 clients share one pooled HTTP/2 connection pool
+        self.http_client = httpx.AsyncClient(http2=True, timeout=HTTP_TIMEOUT, limits=HTTP_POOL_LIMITS)
+        self.gemma_async_client = AsyncOpenAI(
+            base_url=gemma_base_url,
+            api_key=gemma_api_key,
+            http_client=self.http_client,
+            max_retries=LLM_MAX_RETRIES
+        )
+        self.deepseek_async_client = AsyncOpenAI(
             base_url=deepseek_base_url,
-            api_key=deepseek_api_key
+            api_key=deepseek_api_key,
+            http_client=self.http_client,
+            max_retries=LLM_MAX_RETRIES
         )
         
+        # Successful generations, shared by all generation paths
+        self.generation_cache = GenerationCache()
+        
         # Initialize Gemini as fallback
         self.gemini_available = False
         self.gemini_model = None
@@ -90,7 +299,91 @@ class TELUSAIService:
         else:
             logger.info("Gemini library not installed, will use fallback responses")
     
-    def generate_personalized_recommendation(
+    async def warmup(self):
+        """
+        Connect to the AI services ahead of the first request
+        
+        The first call on each client pays for DNS and TLS setup. This makes
+        token-free calls at startup instead: a model listing on each TELUS
+        endpoint and a model lookup on Gemini, which also checks the API
+        key. Failures are logged and ignored - requests work the same
+        without a warm-up.
+        """
+        calls = [
+            self.gemma_async_client.models.list(),
+            self.deepseek_async_client.models.list()
+        ]
+        if self.gemini_available and self.gemini_model:
+            # Metadata only, no generation (the library's lookup is sync)
+            calls.append(asyncio.to_thread(genai.get_model, self.gemini_model.model_name))
+        
+        results = await asyncio.gather(*calls, return_exceptions=True)
+        failures = [result for result in results if isinstance(result, Exception)]
+        if failures:
+            logger.warning("AI client warm-up: %d of %d calls failed: %s", len(failures), len(results), failures[0])
+        else:
+            logger.info("AI clients warmed up")
+    
+    async def aclose(self):
+        """Close the shared HTTP connection pool"""
+        await self.http_client.aclose()
+    
+    @staticmethod
+    def _gemini_prompt(prompt: Prompt) -> str:
+        """Single Gemini prompt: system part, then the request's data"""
+        system, user = prompt
+        return f"{system}\n\n{user}"
+    
+    @staticmethod
+    def _chat_messages(prompt: Prompt) -> List[Dict[str, str]]:
+        """TELUS chat messages; the system message is identical across requests"""
+        system, user = prompt
+        return [
+            {"role": "system", "content": system},
+            {"role": "user", "content": user}
+        ]
+    
+    async def _generate_text_async(self, prompt: Prompt, telus_client: AsyncOpenAI, telus_model: str,
+                                   max_tokens: int, temperature: float, task: str) -> Optional[str]:
+        """
+        Generate text with Gemini (primary), falling back to a TELUS AI model
+        
+        Returns:
+            Generated text, or None if every service failed
+        """
+        cache_key = GenerationCache.key(prompt, telus_model, max_tokens, temperature)
+        text = self.generation_cache.get(cache_key)
+        if text:
+            return text
+        
+        # Try Gemini first (primary)
+        if self.gemini_available and self.gemini_model:
+            try:
+                response = await self.gemini_model.generate_content_async(self._gemini_prompt(prompt))
+                text = response.text.strip()
+                logger.info(f"Successfully used Gemini for {task}")
+            except Exception as gemini_error:
+                logger.warning(f"Gemini failed: {gemini_error}. Trying TELUS AI fallback...")
+        
+        # Fallback to TELUS AI if Gemini not available or failed
+        if not text:
+            try:
+                response = await telus_client.chat.completions.create(
+                    model=telus_model,
+                    messages=self._chat_messages(prompt),
+                    max_tokens=max_tokens,
+                    temperature=temperature
+                )
+                text = response.choices[0].message.content.strip()
+                logger.info(f"Used TELUS AI {telus_model} as fallback")
+            except Exception as e:
+                logger.warning(f"TELUS AI {telus_model} also failed: {e}")
+        
+        if text:
+            self.generation_cache.put(cache_key, text)
+        return text
+    
+    async def generate_personalized_recommendation_async(
         self,
         current_mood: Dict[str, Any],
         mood_history: List[Dict[str, Any]],
@@ -112,130 +405,186 @@ class TELUSAIService:
             Personalized recommendation with title, description, and priority
         """
         try:
-            # Build context from mood data
-            mood_score = current_mood.get("mood_score", 5.0)
-            sentiment = current_mood.get("sentiment", {}).get("label", "NEUTRAL")
-            top_emotions = sorted(
-                current_mood.get("emotions", {}).items(),
-                key=lambda x: x[1],
-                reverse=True
-            )[:3]
-            
-            trend = patterns.get("trend", "STABLE")
-            avg_mood = patterns.get("average_mood", 5.0)
-            
-            # Create prompt for personalized recommendation
-            if is_crisis:
-                prompt = f"""You are a compassionate mental health AI assistant. This is a CRISIS SITUATION requiring immediate support.
-
-User's Message: "{user_text if user_text else 'Not provided'}"
-
-Current Mood:
-- Mood Score: {mood_score}/10
-- Sentiment: {sentiment}
-- Top Emotions: {', '.join([f'{e[0]} ({e[1]:.0%})' for e in top_emotions])}
-
-⚠️ CRITICAL: The user is in crisis. Your recommendation MUST prioritize:
-1. Immediate professional support (crisis hotlines, mental health professionals)
-2. Connecting with trusted people (friends, family)
-3. Safety and immediate support resources
-
-DO NOT suggest wellness activities like breathing exercises, light exercise, or self-care as primary recommendations. Those are not appropriate for crisis situations.
-
-Provide a brief (2-3 sentences), empathetic recommendation focused on immediate support and professional help.
-
-Recommendation:"""
-            else:
-                # Include user's actual message for context-aware recommendations
-                user_context = f'\nUser\'s Message: "{user_text}"' if user_text else ""
-                
-                prompt = f"""You are a compassionate mental health AI assistant. Based on the following user data, provide a personalized, empathetic recommendation that is SPECIFIC to their situation.
-
-{user_context}
-
-Current Mood:
-- Mood Score: {mood_score}/10
-- Sentiment: {sentiment}
-- Top Emotions: {', '.join([f'{e[0]} ({e[1]:.0%})' for e in top_emotions])}
-
-Mood Patterns:
-- Trend: {trend}
-- Average Mood: {avg_mood:.1f}/10
-
-IMPORTANT: Your recommendation should be SPECIFIC to what the user mentioned. For example:
-- If they mention exam anxiety → suggest study strategies, time management, test preparation tips
-- If they mention work stress → suggest work-life balance, task prioritization, boundary setting
-- If they mention relationship issues → suggest communication strategies, support resources
-- If they mention general anxiety → suggest grounding techniques, breathing exercises
-
-Provide a brief (2-3 sentences), supportive, and actionable recommendation that directly addresses their specific situation. Be empathetic and contextually relevant.
-
-Recommendation:"""
-
-            # Use Gemini as primary, TELUS AI as fallback (since TELUS AI is deactivated)
-            recommendation_text = None
-            
-            # Try Gemini first (primary)
-            if self.gemini_available and self.gemini_model:
-                try:
-                    response = self.gemini_model.generate_content(prompt)
-                    recommendation_text = response.text.strip()
-                    logger.info("Successfully used Gemini for recommendation")
-                except Exception as gemini_error:
-                    logger.warning(f"Gemini failed: {gemini_error}. Trying TELUS AI fallback...")
-            
-            # Fallback to TELUS AI if Gemini not available or failed
-            if not recommendation_text:
-                try:
-                    response = self.gemma_client.completions.create(
-                        model="google/gemma-3-27b-it",  # Model name from TELUS documentation
-                        prompt=prompt,
-                        max_tokens=200,
-                        temperature=0.7
-                    )
-                    recommendation_text = response.choices[0].text.strip()
-                    logger.info("Used TELUS AI Gemma as fallback")
-                except Exception as e:
-                    logger.warning(f"TELUS AI Gemma also failed: {e}")
-            
-            # If still no recommendation, use default
-            if not recommendation_text:
-                raise Exception("All AI services failed, using default recommendation")
-            
-            # Determine priority based on crisis status and mood score
-            if is_crisis:
-                priority = "CRITICAL"
-                title = "Immediate Support Needed"
-            elif mood_score < 3.0:
-                priority = "HIGH"
-                title = "Immediate Support Recommended"
-            elif mood_score < 5.0:
-                priority = "MEDIUM"
-                title = "Wellness Focus"
-            else:
-                priority = "LOW"
-                title = "Maintain Your Progress"
-            
-            return {
-                "title": title,
-                "description": recommendation_text,
-                "priority": priority,
-                "type": "AI_GENERATED",
-                "source": "gemma-3-27b"
-            }
-            
+            prompt = self._build_recommendation_prompt(current_mood, patterns, is_crisis, user_text)
+            recommendation_text = await self._generate_text_async(
+                prompt, self.gemma_async_client, GEMMA_MODEL,
+                max_tokens=RECOMMENDATION_MAX_TOKENS, temperature=0.7, task="recommendation"
+            )
+            return self._recommendation_result(recommendation_text, current_mood, is_crisis)
         except Exception as e:
-            logger.error(f"Error generating personalized recommendation: {e}")
-            # Fallback to default recommendation
-            return {
-                "title": "Continue Tracking Your Mood",
-                "description": "Keep monitoring your mood patterns to identify trends and triggers.",
-                "priority": "LOW",
-                "type": "FALLBACK",
-                "error": str(e)
-            }
+            return self._recommendation_fallback(e)
+    
+    async def stream_personalized_recommendation(
+        self,
+        current_mood: Dict[str, Any],
+        patterns: Dict[str, Any],
+        user_text: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """
+        Stream a non-crisis recommendation as it is generated
+        
+        Yields text chunks from Gemini (primary) or TELUS AI (fallback), so a
+        client can show the first words instead of waiting for the whole
+        recommendation. A cached recommendation is yielded in one chunk, and
+        the fallback description is yielded if neither service produced text.
+        If a stream fails partway through, the fallback description follows
+        the partial text (after a blank line) so the client knows it was cut
+        short; such text is never cached.
+        Crisis recommendations are not streamed: they go through
+        `generate_personalized_recommendation_async` like the other
+        crisis responses.
+        
+        Args:
+            current_mood: Current mood analysis
+            patterns: Identified mood patterns
+            user_text: Optional user's actual message text for context
+            
+        Yields:
+            Recommendation text chunks
+        """
+        prompt = self._build_recommendation_prompt(current_mood, patterns, False, user_text)
+        cache_key = GenerationCache.key(prompt, GEMMA_MODEL, RECOMMENDATION_MAX_TOKENS, 0.7)
+        text = self.generation_cache.get(cache_key)
+        if text:
+            yield text
+            return
+        
+        chunks: List[str] = []
+        # Only a stream that ran to the end is cached: a mid-stream failure
+        # leaves truncated text that must not be served as a recommendation
+        completed = False
+        
+        # Try Gemini first (primary). Once text has been sent there is no
+        # switching services, so a mid-stream failure ends the stream.
+        if self.gemini_available and self.gemini_model:
+            try:
+                response = await self.gemini_model.generate_content_async(self._gemini_prompt(prompt), stream=True)
+                async for chunk in response:
+                    if chunk.text:
+                        chunks.append(chunk.text)
+                        yield chunk.text
+                completed = True
+                logger.info("Successfully streamed Gemini recommendation")
+            except Exception as gemini_error:
+                logger.warning("Gemini streaming failed: %s", gemini_error)
+        
+        # Fallback to TELUS AI if Gemini not available or failed before any text
+        if not chunks:
+            completed = False
+            try:
+                response = await self.gemma_async_client.chat.completions.create(
+                    model=GEMMA_MODEL,
+                    messages=self._chat_messages(prompt),
+                    max_tokens=RECOMMENDATION_MAX_TOKENS,
+                    temperature=0.7,
+                    stream=True
+                )
+                async for chunk in response:
+                    piece = chunk.choices[0].delta.content
+                    if piece:
+                        chunks.append(piece)
+                        yield piece
+                completed = True
+                logger.info("Streamed TELUS AI %s recommendation as fallback", GEMMA_MODEL)
+            except Exception as e:
+                logger.warning("TELUS AI %s streaming also failed: %s", GEMMA_MODEL, e)
+        
+        text = "".join(chunks).strip()
+        if text and completed:
+            self.generation_cache.put(cache_key, text)
+        elif text:
+            fallback = self._recommendation_fallback(Exception("Recommendation stream ended early"))
+            yield "\n\n" + fallback["description"]
+        else:
+            yield self._recommendation_fallback(Exception("All AI services failed, using default recommendation"))["description"]
+    
+    def _build_recommendation_prompt(
+        self,
+        current_mood: Dict[str, Any],
+        patterns: Dict[str, Any],
+        is_crisis: bool,
+        user_text: Optional[str]
+    ) -> Prompt:
+        """Build the recommendation prompt from mood data"""
+        # Build context from mood data (score quantized, see _bucket)
+        mood_score = _bucket(current_mood.get("mood_score", 5.0))
+        sentiment = current_mood.get("sentiment", {}).get("label", "NEUTRAL")
+        # (a failed analysis also carries an "error" message among its emotions)
+        emotion_scores = ((e, score) for e, score in current_mood.get("emotions", {}).items() if e != "error")
+        top_emotions = heapq.nlargest(3, emotion_scores, key=lambda x: x[1])
+        
+        emotions_text = ", ".join([f"{e[0]} ({e[1]:.0%})" for e in top_emotions])
+        
+        trend = patterns.get("trend", "STABLE")
+        avg_mood = patterns.get("average_mood", 5.0)
+        
+        # Create prompt for personalized recommendation
+        if is_crisis:
+            return CRISIS_RECOMMENDATION_SYSTEM, CRISIS_RECOMMENDATION_PROMPT.format(
+                user_text=user_text if user_text else 'Not provided',
+                mood_score=mood_score,
+                sentiment=sentiment,
+                top_emotions=emotions_text
+            )
+        
+        # Include user's actual message for context-aware recommendations
+        user_context = f'User\'s Message: "{user_text}"\n\n' if user_text else ""
+        
+        return RECOMMENDATION_SYSTEM, RECOMMENDATION_PROMPT.format(
+            user_context=user_context,
+            mood_score=mood_score,
+            sentiment=sentiment,
+            top_emotions=emotions_text,
+            trend=trend,
+            avg_mood=avg_mood
+        )
     
-    def analyze_crisis_reasoning(
+    def _recommendation_result(
+        self,
+        recommendation_text: Optional[str],
+        current_mood: Dict[str, Any],
+        is_crisis: bool
+    ) -> Dict[str, Any]:
+        """Wrap generated text in a recommendation, prioritized by crisis status and mood score"""
+        # If no service produced a recommendation, use default
+        if not recommendation_text:
+            raise Exception("All AI services failed, using default recommendation")
+        
+        # Determine priority based on crisis status and mood score
+        mood_score = current_mood.get("mood_score", 5.0)
+        if is_crisis:
+            priority = "CRITICAL"
+            title = "Immediate Support Needed"
+        elif mood_score < 3.0:
+            priority = "HIGH"
+            title = "Immediate Support Recommended"
+        elif mood_score < 5.0:
+            priority = "MEDIUM"
+            title = "Wellness Focus"
+        else:
+            priority = "LOW"
+            title = "Maintain Your Progress"
+        
+        return {
+            "title": title,
+            "description": recommendation_text,
+            "priority": priority,
+            "type": "AI_GENERATED",
+            "source": "gemma-3-27b"
+        }
+    
+    def _recommendation_fallback(self, error: Exception) -> Dict[str, Any]:
+        """Default recommendation when generation fails"""
+        logger.error(f"Error generating personalized recommendation: {error}")
+        return {
+            "title": "Continue Tracking Your Mood",
+            "description": "Keep monitoring your mood patterns to identify trends and triggers.",
+            "priority": "LOW",
+            "type": "FALLBACK",
+            "error": str(error)
+        }
+    
+    async def analyze_crisis_reasoning_async(
         self,
         text: str,
         mood_analysis: Dict[str, Any],
@@ -253,106 +602,80 @@ Recommendation:"""
             Enhanced crisis analysis with reasoning
         """
         try:
-            mood_score = mood_analysis.get("mood_score", 5.0)
-            sentiment = mood_analysis.get("sentiment", {}).get("label", "NEUTRAL")
-            emotions = mood_analysis.get("emotions", {})
-            
-            # Create prompt for crisis reasoning
-            prompt = f"""You are a mental health crisis assessment AI. Analyze the following situation and determine if immediate support is needed.
-
-User Statement: "{text}"
-
-Mood Analysis:
-- Mood Score: {mood_score}/10
-- Sentiment: {sentiment}
-- Emotions: {emotions}
-
-Initial Risk Assessment: {keyword_risk_level}
-
-Analyze the context, nuance, and severity. Consider:
-1. Is there immediate danger to self or others?
-2. Are there subtle indicators of distress?
-3. What is the emotional intensity?
-
-Provide:
-1. Risk Level (LOW, MEDIUM, HIGH, CRITICAL)
-2. Brief reasoning (1-2 sentences explaining why)
-3. Key indicators detected
-
-Format your response as:
-RISK_LEVEL: [level]
-REASONING: [explanation]
-INDICATORS: [list of key indicators]"""
-
-            # Use Gemini as primary, TELUS AI as fallback (since TELUS AI is deactivated)
-            reasoning_text = None
-            
-            # Try Gemini first (primary)
-            if self.gemini_available and self.gemini_model:
-                try:
-                    response = self.gemini_model.generate_content(prompt)
-                    reasoning_text = response.text.strip()
-                    logger.info("Successfully used Gemini for crisis reasoning")
-                except Exception as gemini_error:
-                    logger.warning(f"Gemini failed: {gemini_error}. Trying TELUS AI fallback...")
-            
-            # Fallback to TELUS AI if Gemini not available or failed
-            if not reasoning_text:
-                try:
-                    response = self.deepseek_client.completions.create(
-                        model="deepseek-ai/DeepSeek-V3",  # Model name for deepseekv32 endpoint
-                        prompt=prompt,
-                        max_tokens=300,
-                        temperature=0.3  # Lower temperature for more consistent reasoning
-                    )
-                    reasoning_text = response.choices[0].text.strip()
-                    logger.info("Used TELUS AI DeepSeek as fallback")
-                except Exception as e:
-                    logger.warning(f"TELUS AI DeepSeek also failed: {e}")
-            
-            # If still no reasoning, use default
-            if not reasoning_text:
-                raise Exception("All AI services failed, using keyword-based detection")
-            
-            # Parse response
-            risk_level = keyword_risk_level  # Default to keyword-based
-            reasoning = ""
-            indicators = []
-            
-            lines = reasoning_text.split('\n')
-            for line in lines:
-                if line.startswith('RISK_LEVEL:'):
-                    risk_level = line.split(':', 1)[1].strip()
-                elif line.startswith('REASONING:'):
-                    reasoning = line.split(':', 1)[1].strip()
-                elif line.startswith('INDICATORS:'):
-                    indicators_text = line.split(':', 1)[1].strip()
-                    indicators = [i.strip() for i in indicators_text.split(',')]
-            
-            # Safety: If keyword detection says HIGH, always keep it HIGH
-            if keyword_risk_level == "HIGH":
-                risk_level = "HIGH"
-            
-            return {
-                "risk_level": risk_level,
-                "reasoning": reasoning if reasoning else "AI analysis indicates potential concern based on mood patterns and emotional state.",
-                "indicators": indicators if indicators else ["Mood analysis suggests monitoring may be beneficial"],
-                "ai_enhanced": True,
-                "source": "deepseekv32"
-            }
-            
+            prompt = self._build_crisis_prompt(text, mood_analysis, keyword_risk_level)
+            reasoning_text = await self._generate_text_async(
+                prompt, self.deepseek_async_client, DEEPSEEK_MODEL,
+                max_tokens=CRISIS_REASONING_MAX_TOKENS,
+                temperature=0.3,  # Lower temperature for more consistent reasoning
+                task="crisis reasoning"
+            )
+            return self._crisis_reasoning_result(reasoning_text, keyword_risk_level)
         except Exception as e:
-            logger.error(f"Error in crisis reasoning: {e}")
-            # Fallback to keyword-based detection
-            return {
-                "risk_level": keyword_risk_level,
-                "reasoning": "Unable to perform advanced analysis. Using keyword-based detection.",
-                "indicators": [],
-                "ai_enhanced": False,
-                "error": str(e)
-            }
+            return self._crisis_reasoning_fallback(keyword_risk_level, e)
     
-    def generate_pattern_insights(
+    def _build_crisis_prompt(self, text: str, mood_analysis: Dict[str, Any], keyword_risk_level: str) -> Prompt:
+        """Build the crisis reasoning prompt"""
+        mood_score = mood_analysis.get("mood_score", 5.0)
+        sentiment = mood_analysis.get("sentiment", {}).get("label", "NEUTRAL")
+        # Two decimals carry all the signal the model needs, in fewer tokens
+        emotions = {
+            emotion: round(score, 2)
+            for emotion, score in mood_analysis.get("emotions", {}).items() if emotion != "error"
+        }
+        
+        return CRISIS_REASONING_SYSTEM, CRISIS_REASONING_PROMPT.format(
+            text=text,
+            mood_score=mood_score,
+            sentiment=sentiment,
+            emotions=emotions,
+            keyword_risk_level=keyword_risk_level
+        )
+    
+    def _crisis_reasoning_result(self, reasoning_text: Optional[str], keyword_risk_level: str) -> Dict[str, Any]:
+        """Parse the model's RISK_LEVEL / REASONING / INDICATORS response"""
+        # If still no reasoning, use default
+        if not reasoning_text:
+            raise Exception("All AI services failed, using keyword-based detection")
+        
+        # Parse response
+        risk_level = keyword_risk_level  # Default to keyword-based
+        reasoning = ""
+        indicators = []
+        
+        lines = reasoning_text.split('\n')
+        for line in lines:
+            if line.startswith('RISK_LEVEL:'):
+                risk_level = line.split(':', 1)[1].strip()
+            elif line.startswith('REASONING:'):
+                reasoning = line.split(':', 1)[1].strip()
+            elif line.startswith('INDICATORS:'):
+                indicators_text = line.split(':', 1)[1].strip()
+                indicators = [i.strip() for i in indicators_text.split(',')]
+        
+        # Safety: If keyword detection says HIGH, always keep it HIGH
+        if keyword_risk_level == "HIGH":
+            risk_level = "HIGH"
+        
+        return {
+            "risk_level": risk_level,
+            "reasoning": reasoning if reasoning else "AI analysis indicates potential concern based on mood patterns and emotional state.",
+            "indicators": indicators if indicators else ["Mood analysis suggests monitoring may be beneficial"],
+            "ai_enhanced": True,
+            "source": "deepseekv32"
+        }
+    
+    def _crisis_reasoning_fallback(self, keyword_risk_level: str, error: Exception) -> Dict[str, Any]:
+        """Keyword-based result when crisis reasoning fails"""
+        logger.error(f"Error in crisis reasoning: {error}")
+        return {
+            "risk_level": keyword_risk_level,
+            "reasoning": "Unable to perform advanced analysis. Using keyword-based detection.",
+            "indicators": [],
+            "ai_enhanced": False,
+            "error": str(error)
+        }
+    
+    async def generate_pattern_insights_async(
         self,
         patterns: Dict[str, Any],
         mood_history: List[Dict[str, Any]]
@@ -368,65 +691,103 @@ INDICATORS: [list of key indicators]"""
             Natural language insight text
         """
         try:
-            trend = patterns.get("trend", "STABLE")
-            avg_mood = patterns.get("average_mood", 5.0)
-            common_emotions = patterns.get("common_emotions", {})
-            time_patterns = patterns.get("time_patterns", {})
+            prompt = self._build_insights_prompt(patterns)
+            insight = await self._generate_text_async(
+                prompt, self.gemma_async_client, GEMMA_MODEL,
+                max_tokens=INSIGHTS_MAX_TOKENS, temperature=0.7, task="pattern insights"
+            )
             
-            # Build prompt for pattern insights
-            prompt = f"""You are a mental health insights AI. Analyze the following mood patterns and provide a brief, empathetic insight (2-3 sentences).
-
-Mood Patterns:
-- Trend: {trend}
-- Average Mood: {avg_mood:.1f}/10
-- Common Emotions: {common_emotions}
-- Time Patterns: {time_patterns}
-
-Provide a supportive, human-readable insight that helps the user understand their mood patterns. Be specific and actionable.
-
-Insight:"""
-
-            # Use Gemini as primary, TELUS AI as fallback (since TELUS AI is deactivated)
-            insight = None
-            
-            # Try Gemini first (primary)
-            if self.gemini_available and self.gemini_model:
-                try:
-                    response = self.gemini_model.generate_content(prompt)
-                    insight = response.text.strip()
-                    logger.info("Successfully used Gemini for pattern insights")
-                except Exception as gemini_error:
-                    logger.warning(f"Gemini failed: {gemini_error}. Trying TELUS AI fallback...")
-            
-            # Fallback to TELUS AI if Gemini not available or failed
-            if not insight:
-                try:
-                    response = self.gemma_client.completions.create(
-                        model="google/gemma-3-27b-it",  # Model name from TELUS documentation
-                        prompt=prompt,
-                        max_tokens=150,
-                        temperature=0.7
-                    )
-                    insight = response.choices[0].text.strip()
-                    logger.info("Used TELUS AI Gemma as fallback")
-                except Exception as telus_error:
-                    logger.warning(f"TELUS AI Gemma also failed: {telus_error}")
-            
-            # If still no insight, use default fallback
             if not insight:
                 raise Exception("All AI services failed, using default insight")
             
             return insight
             
         except Exception as e:
-            logger.error(f"Error generating pattern insights: {e}")
-            # Fallback to basic insight
-            if trend == "IMPROVING":
-                return "Your mood shows an improving trend. Keep up the positive momentum!"
-            elif trend == "DECLINING":
-                return "Your mood trend shows a decline. Consider reaching out for support."
-            else:
-                return "Continue tracking your mood to identify patterns and trends."
+            return self._insights_fallback(patterns, e)
+    
+    async def batch_generate_pattern_insights(
+        self,
+        items: List[Tuple[Dict[str, Any], List[Dict[str, Any]]]],
+        qpm: int = 500,
+        concurrency: int = 64
+    ) -> List[str]:
+        """
+        Generate pattern insights for many users concurrently
+        
+        For background jobs (e.g. refreshing every user's insight) that would
+        otherwise await one network round-trip per user in turn. Requests are
+        started no faster than `qpm` per minute with at most `concurrency`
+        in flight; each item falls back to its default insight independently.
+        
+        Args:
+            items: (patterns, mood_history) per user
+            qpm: Maximum requests started per minute (provider rate limit)
+            concurrency: Maximum requests in flight
+            
+        Returns:
+            One insight per item, in input order
+            
+        Raises:
+            ValueError: If qpm or concurrency is not positive
+        """
+        if qpm <= 0 or concurrency <= 0:
+            raise ValueError(f"qpm and concurrency must be positive (got qpm={qpm}, concurrency={concurrency})")
+        
+        semaphore = asyncio.Semaphore(concurrency)
+        interval = 60.0 / qpm
+        loop = asyncio.get_running_loop()
+        next_start = loop.time()
+        
+        async def generate(patterns: Dict[str, Any], mood_history: List[Dict[str, Any]]) -> str:
+            nonlocal next_start
+            async with semaphore:
+                # Claim the next start slot, then wait for it
+                start = max(next_start, loop.time())
+                next_start = start + interval
+                await asyncio.sleep(start - loop.time())
+                return await self.generate_pattern_insights_async(patterns, mood_history)
+        
+        return list(await asyncio.gather(*(generate(patterns, history) for patterns, history in items)))
+    
+    def _build_insights_prompt(self, patterns: Dict[str, Any]) -> Prompt:
+        """Build the pattern insights prompt"""
+        trend = patterns.get("trend", "STABLE")
+        avg_mood = patterns.get("average_mood", 5.0)
+        
+        # Top emotions as whole percentages, like the recommendation prompt: raw
+        # averages carry full float precision, so the prompt (and its generation
+        # cache key) would otherwise differ on every new entry
+        top_emotions = heapq.nlargest(PROMPT_TOP_K, patterns.get("common_emotions", {}).items(), key=lambda x: x[1])
+        common_emotions = ", ".join(f"{emotion} ({score:.0%})" for emotion, score in top_emotions) or "None"
+        
+        # Average mood per time of day, best first (from the TIME_OF_DAY pattern;
+        # "None" until every daypart has entries)
+        daypart_averages = {}
+        for pattern in patterns.get("patterns", []):
+            if pattern.get("type") == "TIME_OF_DAY":
+                daypart_averages.update(pattern.get("averages", {}))
+        time_patterns = ", ".join(
+            f"{daypart}: {average:.1f}"
+            for daypart, average in heapq.nlargest(PROMPT_TOP_K, daypart_averages.items(), key=lambda x: x[1])
+        ) or "None"
+        
+        return INSIGHTS_SYSTEM, INSIGHTS_PROMPT.format(
+            trend=trend,
+            avg_mood=avg_mood,
+            common_emotions=common_emotions,
+            time_patterns=time_patterns
+        )
+    
+    def _insights_fallback(self, patterns: Dict[str, Any], error: Exception) -> str:
+        """Basic trend-based insight when generation fails"""
+        logger.error(f"Error generating pattern insights: {error}")
+        trend = patterns.get("trend", "STABLE")
+        if trend == "IMPROVING":
+            return "Your mood shows an improving trend. Keep up the positive momentum!"
+        elif trend == "DECLINING":
+            return "Your mood trend shows a decline. Consider reaching out for support."
+        else:
+            return "Continue tracking your mood to identify patterns and trends."
 
 
 # Global TELUS AI service instance
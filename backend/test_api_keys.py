@@ -1,65 +1,86 @@
 """
 Test script to check if TELUS AI Factory API keys are still active
 """
-from openai import OpenAI
+from openai import AsyncOpenAI
+import asyncio
+import httpx
 import sys
 
-def test_gemma_api():
-    """Test Gemma-3-27b API"""
-    print("Testing Gemma-3-27b API...")
-    try:
-        client = OpenAI(
-            base_url="https://gemma-3-27b-3ca9s.paas.ai.telus.com/v1",
-            api_key="dc8704d41888afb2b889a8ebac81d12f"
-        )
-        response = client.completions.create(
-            model="google/gemma-3-27b-it",
-            prompt="Say hello in one word.",
-            max_tokens=10
-        )
-        print("[OK] Gemma API: WORKING")
-        print(f"   Response: {response.choices[0].text.strip()}")
-        return True
-    except Exception as e:
-        print("[FAIL] Gemma API: FAILED")
-        print(f"   Error: {str(e)[:200]}")
-        return False
+# (name, base_url, api_key, model) for each endpoint to probe
+ENDPOINTS = (
+    (
+        "Gemma",
+        "https://gemma-3-27b-3ca9s.paas.ai.telus.com/v1",
+        "dc8704d41888afb2b889a8ebac81d12f",
+        "google/gemma-3-27b-it"
+    ),
+    (
+        "DeepSeek",
+        "https://deepseekv32-3ca9s.paas.ai.telus.com/v1",
+        "a12a7d3705b12aeb46eb4cc8d77f5446",
+        "deepseek-ai/DeepSeek-V3"
+    ),
+)
 
-def test_deepseek_api():
-    """Test DeepSeekV32 API"""
-    print("\nTesting DeepSeekV32 API...")
+async def probe_api(http_client, base_url, api_key, model):
+    """
+    Send a one-word prompt to one endpoint
+
+    The reply is streamed and the probe stops at the first token: a token
+    back proves the key and model work, so there's no need to wait for
+    the rest of the generation.
+
+    Returns:
+        (working, detail) - the model's first token, or the error
+    """
+    client = AsyncOpenAI(base_url=base_url, api_key=api_key, http_client=http_client)
     try:
-        client = OpenAI(
-            base_url="https://deepseekv32-3ca9s.paas.ai.telus.com/v1",
-            api_key="a12a7d3705b12aeb46eb4cc8d77f5446"
-        )
-        response = client.completions.create(
-            model="deepseek-ai/DeepSeek-V3",
-            prompt="Say hello in one word.",
-            max_tokens=10
+        # Same chat endpoint the app uses
+        stream = await client.chat.completions.create(
+            model=model,
+            messages=[{"role": "user", "content": "Say hello in one word."}],
+            max_tokens=10,
+            stream=True
         )
-        print("[OK] DeepSeek API: WORKING")
-        print(f"   Response: {response.choices[0].text.strip()}")
-        return True
+        async for chunk in stream:
+            token = chunk.choices[0].delta.content if chunk.choices else None
+            if token:
+                return True, f"First token: {token.strip() or repr(token)}"
+        return False, "Error: stream ended without any text"
     except Exception as e:
-        print("[FAIL] DeepSeek API: FAILED")
-        print(f"   Error: {str(e)[:200]}")
-        return False
+        return False, f"Error: {str(e)[:200]}"
+
+async def probe_all_apis():
+    """Probe every endpoint concurrently; results are in ENDPOINTS order"""
+    # One HTTP/2 client for both probes; the transport retries a failed connect once
+    transport = httpx.AsyncHTTPTransport(http2=True, retries=1)
+    async with httpx.AsyncClient(transport=transport, timeout=30.0) as http_client:
+        return await asyncio.gather(*(
+            probe_api(http_client, base_url, api_key, model)
+            for _, base_url, api_key, model in ENDPOINTS
+        ))
 
 if __name__ == "__main__":
     print("=" * 60)
     print("TELUS AI Factory API Key Status Check")
     print("=" * 60)
-    
-    gemma_works = test_gemma_api()
-    deepseek_works = test_deepseek_api()
-    
+
+    print("Testing Gemma-3-27b and DeepSeekV32 APIs...")
+    gemma_result, deepseek_result = asyncio.run(probe_all_apis())
+
+    for (name, *_), (works, detail) in zip(ENDPOINTS, (gemma_result, deepseek_result)):
+        print(f"\n[OK] {name} API: WORKING" if works else f"\n[FAIL] {name} API: FAILED")
+        print(f"   {detail}")
+
+    gemma_works = gemma_result[0]
+    deepseek_works = deepseek_result[0]
+
     print("\n" + "=" * 60)
     print("Summary:")
     print(f"  Gemma-3-27b: {'[ACTIVE]' if gemma_works else '[DEACTIVATED/ERROR]'}")
     print(f"  DeepSeekV32: {'[ACTIVE]' if deepseek_works else '[DEACTIVATED/ERROR]'}")
     print("=" * 60)
-    
+
     if not gemma_works and not deepseek_works:
         print("\n[WARNING] Both API keys appear to be deactivated or endpoints changed.")
         print("   The app will still work but TELUS AI features will use fallback responses.")
@@ -68,4 +89,3 @@ if __name__ == "__main__":
         print("   Some TELUS AI features may not work.")
     else:
         print("\n[SUCCESS] All API keys are active!")
-
@@ -89,7 +89,8 @@ export interface MoodHistoryEntry {
     score: number
   }
   emotions: Record<string, number>
-  text: string
+  text_length: number
+  text_hash: string
 }
 
 export const moodAPI = {